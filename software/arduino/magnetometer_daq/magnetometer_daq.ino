@@ -32,6 +32,7 @@
 #define ADXL_ADDRESS      0x53    // ADXL345 I²C address
 #define SERIAL_BAUD       115200
 #define BUFFER_SIZE       512     // SD write buffer
+#define LOG_BINARY        0       // 1 = log raw SensorData records (.BIN) instead of CSV
 
 // ===== GLOBAL VARIABLES =====
 File logFile;
@@ -41,6 +42,8 @@ uint32_t lastSampleMicros = 0;
 uint32_t sampleIntervalMicros;
 
 // Sensor data structure
+// Binary logs store this struct verbatim (little-endian, 28 bytes, no
+// padding); analysis/data_loader.py reads it with a matching numpy dtype.
 struct SensorData {
     uint32_t timestamp_us;
     int16_t mag1_x, mag1_y, mag1_z;
@@ -48,6 +51,17 @@ struct SensorData {
     int16_t mag3_x, mag3_y, mag3_z;
     int16_t acc_x, acc_y, acc_z;
 };
+static_assert(sizeof(SensorData) == 28, "SensorData must be packed for binary logs");
+
+// Binary log file header (16 bytes), followed by SensorData records
+struct LogHeader {
+    char magic[8];            // "PAISDAQ" + NUL
+    uint16_t version;         // Format version (1)
+    uint16_t record_size;     // sizeof(SensorData)
+    uint16_t sample_rate_hz;  // Configured sample rate
+    uint16_t reserved;
+};
+static_assert(sizeof(LogHeader) == 16, "LogHeader must be packed for binary logs");
 
 SensorData currentData;
 char sdBuffer[BUFFER_SIZE];
@@ -278,7 +292,7 @@ void readADXL345(int16_t* x, int16_t* y, int16_t* z) {
 void createNewLogFile() {
     // Find next available filename
     for (int i = 0; i < 1000; i++) {
-        sprintf(filename, "LOG%03d.CSV", i);
+        sprintf(filename, LOG_BINARY ? "LOG%03d.BIN" : "LOG%03d.CSV", i);
         if (!SD.exists(filename)) {
             break;
         }
@@ -287,7 +301,13 @@ void createNewLogFile() {
     logFile = SD.open(filename, FILE_WRITE);
     if (logFile) {
         // Write header
+#if LOG_BINARY
+        LogHeader header = {{'P', 'A', 'I', 'S', 'D', 'A', 'Q', '\0'},
+                            1, sizeof(SensorData), SAMPLE_RATE_HZ, 0};
+        logFile.write((const uint8_t*)&header, sizeof(header));
+#else
         logFile.println(F("timestamp_us,m1x,m1y,m1z,m2x,m2y,m2z,m3x,m3y,m3z,ax,ay,az"));
+#endif
         logFile.flush();
         Serial.print(F("Logging to: "));
         Serial.println(filename);
@@ -297,6 +317,16 @@ void createNewLogFile() {
 void writeDataToSD() {
     if (!logFile) return;
     
+#if LOG_BINARY
+    // Append the raw record, writing the buffer out first if it is full
+    if (bufferPos + sizeof(SensorData) > BUFFER_SIZE) {
+        logFile.write(sdBuffer, bufferPos);
+        logFile.flush();
+        bufferPos = 0;
+    }
+    memcpy(sdBuffer + bufferPos, &currentData, sizeof(SensorData));
+    bufferPos += sizeof(SensorData);
+#else
     // Format data line
     int len = snprintf(sdBuffer + bufferPos, BUFFER_SIZE - bufferPos,
         "%lu,%d,%d,%d,%d,%d,%d,%d,%d,%d,%d,%d,%d\n",
@@ -314,6 +344,7 @@ void writeDataToSD() {
         logFile.flush();
         bufferPos = 0;
     }
+#endif
 }
 
 // ===== SERIAL OUTPUT =====
@@ -1,21 +1,48 @@
 # Pais Effect Demonstrator - Python Analysis Tools
 # See docs/06-phase5-analysis.md for detailed documentation
 
-from .data_loader import load_experiment, validate_data
-from .calibration import apply_calibration, apply_accel_calibration
-from .signal_processing import extract_baseline, subtract_baseline, compute_spectrum
-from .statistics import detection_statistics, calculate_upper_bound, test_pais_scaling
+from .data_loader import load_experiment, iter_experiment, validate_data, BinaryLog
+from .quality import check_quality, QualityChecker
+from .calibration import (apply_calibration, apply_accel_calibration, calibrate_array,
+                          calibrate_from_tumble, calibrate_accel_from_tumble)
+from .signal_processing import (extract_baseline, subtract_baseline, compute_spectrum,
+                                compute_spectra, WelchAccumulator, resample_uniform,
+                                correlation_matrix, filter_bank, NotchFilter, lock_in,
+                                synchronous_average, AdaptiveCanceller,
+                                cancel_reference_noise)
+from .statistics import (detection_statistics, scan_statistic, block_bootstrap_test,
+                         circular_shift_test, calculate_upper_bound, test_pais_scaling)
 
 __version__ = "0.1.0"
 __all__ = [
     'load_experiment',
+    'iter_experiment',
     'validate_data', 
+    'BinaryLog',
+    'check_quality',
+    'QualityChecker',
     'apply_calibration',
     'apply_accel_calibration',
+    'calibrate_array',
+    'calibrate_from_tumble',
+    'calibrate_accel_from_tumble',
     'extract_baseline',
     'subtract_baseline',
     'compute_spectrum',
+    'compute_spectra',
+    'WelchAccumulator',
+    'resample_uniform',
+    'correlation_matrix',
+    'filter_bank',
+    'NotchFilter',
+    'lock_in',
+    'synchronous_average',
+    'AdaptiveCanceller',
+    'cancel_reference_noise',
     'detection_statistics',
+    'scan_statistic',
+    'block_bootstrap_test',
+    'circular_shift_test',
     'calculate_upper_bound',
     'test_pais_scaling'
 ]
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+cache.py - Columnar cache sidecars for experiment CSVs
+
+Parsing text CSVs dominates load time, so the first load of a file writes
+a binary copy (one .npy file per column) into a hidden sidecar directory
+next to it:
+
+    data/CV_007_20240115_1520.csv
+    data/.CV_007_20240115_1520.csv.cache/manifest.json
+    data/.CV_007_20240115_1520.csv.cache/col_000.npy ...
+
+The manifest records the source size, mtime and content hash. A cache is
+used when size and mtime match; if only the mtime changed (e.g. the file
+was copied) the content hash decides.
+
+Caches are managed from the command line with cache_tool.py.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+CACHE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+
+def cache_dir(filepath: str) -> Path:
+    """Sidecar cache directory for a data file."""
+    path = Path(filepath)
+    return path.parent / f'.{path.name}.cache'
+
+
+def _source_path(cdir: Path) -> Path:
+    """Data file a sidecar cache directory belongs to."""
+    return cdir.parent / cdir.name[1:-len('.cache')]
+
+
+def _file_hash(path: Path, block_size: int = 1 << 20) -> str:
+    """Content hash of a file, read in blocks."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_manifest(cdir: Path) -> Optional[dict]:
+    try:
+        with open(cdir / MANIFEST_NAME, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != CACHE_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(cdir: Path, manifest: dict):
+    with open(cdir / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _valid_manifest(filepath: str) -> Optional[dict]:
+    """
+    Return the manifest if the cache for filepath is up to date.
+
+    A content-identical file with a new mtime refreshes the manifest
+    rather than invalidating the cache.
+    """
+    path = Path(filepath)
+    cdir = cache_dir(path)
+    manifest = _read_manifest(cdir)
+    if manifest is None:
+        return None
+
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+
+    if st.st_size != manifest['size']:
+        return None
+    if st.st_mtime_ns == manifest['mtime_ns']:
+        return manifest
+
+    if _file_hash(path) != manifest['hash']:
+        return None
+
+    manifest['mtime_ns'] = st.st_mtime_ns
+    try:
+        _write_manifest(cdir, manifest)
+    except OSError:
+        pass
+    return manifest
+
+
+def is_cached(filepath: str) -> bool:
+    """Whether filepath has an up-to-date cache."""
+    return _valid_manifest(filepath) is not None
+
+
+def write_cache(filepath: str, df: pd.DataFrame) -> Optional[Path]:
+    """
+    Write df as the columnar cache of filepath.
+
+    Frames with non-numeric columns are not cached.
+
+    Parameters:
+        filepath: Source data file
+        df: Parsed contents of filepath
+
+    Returns:
+        Cache directory, or None if nothing was written
+    """
+    if not all(np.issubdtype(dtype, np.number) for dtype in df.dtypes):
+        return None
+
+    path = Path(filepath)
+    cdir = cache_dir(path)
+    st = path.stat()
+
+    manifest = {
+        'version': CACHE_VERSION,
+        'source': path.name,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'hash': _file_hash(path),
+        'rows': len(df),
+        'columns': [str(c) for c in df.columns],
+    }
+
+    # Build in a temporary directory so readers never see a partial cache
+    tmp = Path(tempfile.mkdtemp(prefix=f'.{path.name}.', dir=path.parent))
+    try:
+        for i, col in enumerate(df.columns):
+            np.save(tmp / f'col_{i:03d}.npy', df[col].to_numpy())
+        _write_manifest(tmp, manifest)
+        if cdir.exists():
+            shutil.rmtree(cdir)
+        os.replace(tmp, cdir)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    return cdir
+
+
+def open_cached_columns(filepath: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Memory-map the cached columns of filepath.
+
+    Returns:
+        Dict of column name to read-only array, or None if not cached
+    """
+    manifest = _valid_manifest(filepath)
+    if manifest is None:
+        return None
+
+    cdir = cache_dir(filepath)
+    try:
+        return {
+            col: np.load(cdir / f'col_{i:03d}.npy', mmap_mode='r')
+            for i, col in enumerate(manifest['columns'])
+        }
+    except (OSError, ValueError):
+        return None
+
+
+def read_csv_cached(filepath: str, use_cache: bool = True) -> pd.DataFrame:
+    """
+    Read a CSV, serving it from the columnar cache when possible.
+
+    On a cache miss the CSV is parsed and the cache written; an
+    unwritable data directory just means the file is parsed every time.
+
+    Parameters:
+        filepath: Path to CSV data file
+        use_cache: Set False to always parse the CSV
+
+    Returns:
+        DataFrame with the CSV contents
+    """
+    if not use_cache:
+        return pd.read_csv(filepath)
+
+    columns = open_cached_columns(filepath)
+    if columns is not None:
+        return pd.DataFrame({col: np.array(arr) for col, arr in columns.items()})
+
+    df = pd.read_csv(filepath)
+    try:
+        write_cache(filepath, df)
+    except OSError:
+        pass
+    return df
+
+
+def clear_cache(filepath: str) -> bool:
+    """Remove the cache for filepath. Returns True if one existed."""
+    cdir = cache_dir(filepath)
+    if not cdir.is_dir():
+        return False
+    shutil.rmtree(cdir)
+    return True
+
+
+def _find_files(paths: List[str], pattern: str = '*.csv') -> List[Path]:
+    files = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files.extend(sorted(p.rglob(pattern)))
+        else:
+            files.append(p)
+    return files
+
+
+def _find_cache_dirs(paths: List[str]) -> List[Path]:
+    dirs = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            dirs.extend(sorted(d for d in p.rglob('.*.cache') if d.is_dir()))
+        else:
+            cdir = cache_dir(p)
+            if cdir.is_dir():
+                dirs.append(cdir)
+    return dirs
+
+
+def warm_cache(paths: List[str], pattern: str = '*.csv') -> List[Path]:
+    """
+    Build caches for all data files under paths.
+
+    Parameters:
+        paths: Files or directories (searched recursively)
+        pattern: Filename pattern for directory search
+
+    Returns:
+        List of files whose cache was (re)built
+    """
+    built = []
+    for path in _find_files(paths, pattern):
+        if is_cached(path):
+            continue
+        if write_cache(path, pd.read_csv(path)) is not None:
+            built.append(path)
+    return built
+
+
+def prune_cache(paths: List[str], dry_run: bool = False) -> List[Path]:
+    """
+    Remove caches whose source file is missing or has changed.
+
+    Parameters:
+        paths: Files or directories (searched recursively)
+        dry_run: Only report what would be removed
+
+    Returns:
+        List of removed cache directories
+    """
+    removed = []
+    for cdir in _find_cache_dirs(paths):
+        source = _source_path(cdir)
+        if source.exists() and _valid_manifest(source) is not None:
+            continue
+        if not dry_run:
+            shutil.rmtree(cdir)
+        removed.append(cdir)
+    return removed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Manage experiment CSV caches')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    warm = sub.add_parser('warm', help='Build missing or stale caches')
+    warm.add_argument('paths', nargs='+')
+    warm.add_argument('--pattern', default='*.csv',
+                      help='Filename pattern for directories (default: *.csv)')
+
+    prune = sub.add_parser('prune', help='Remove orphaned or stale caches')
+    prune.add_argument('paths', nargs='+')
+    prune.add_argument('--dry-run', action='store_true',
+                       help='List caches without removing them')
+
+    clear = sub.add_parser('clear', help='Remove all caches')
+    clear.add_argument('paths', nargs='+')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'warm':
+        built = warm_cache(args.paths, args.pattern)
+        for path in built:
+            print(f"Cached {path}")
+        print(f"{len(built)} file(s) cached")
+    elif args.command == 'prune':
+        removed = prune_cache(args.paths, args.dry_run)
+        for cdir in removed:
+            print(f"{'Would remove' if args.dry_run else 'Removed'} {cdir}")
+        print(f"{len(removed)} cache(s) {'stale' if args.dry_run else 'removed'}")
+    else:
+        removed = _find_cache_dirs(args.paths)
+        for cdir in removed:
+            shutil.rmtree(cdir)
+        print(f"{len(removed)} cache(s) removed")
+
+    return 0
+
@@ -6,6 +6,7 @@ calibration.py - Apply sensor calibrations
 import numpy as np
 import pandas as pd
 from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
 
 
 @dataclass
@@ -17,6 +18,11 @@ class MagnetometerCalibration:
         offset_x/y/z: Hard iron offset for each axis
         scale_x/y/z: Soft iron scale factor for each axis
         sensitivity: LSB per Tesla (HMC5883L at gain 1 = 1090 LSB/Gauss = 10900 LSB/mT)
+        soft_iron: Optional full 3×3 soft iron matrix, applied after the
+                   per-axis scales (None = identity)
+        offset_std: 1σ uncertainty of each offset (LSB)
+        scale_std: 1σ uncertainty of each scale factor
+        sensitivity_std: 1σ uncertainty of the sensitivity
     """
     offset_x: float = 0.0
     offset_y: float = 0.0
@@ -25,6 +31,23 @@ class MagnetometerCalibration:
     scale_y: float = 1.0
     scale_z: float = 1.0
     sensitivity: float = 10900.0  # LSB per mT
+    soft_iron: Optional[np.ndarray] = None
+    offset_std: float = 0.0
+    scale_std: float = 0.0
+    sensitivity_std: float = 0.0
+
+    @property
+    def offset(self) -> np.ndarray:
+        """Hard iron offset vector (LSB)."""
+        return np.array([self.offset_x, self.offset_y, self.offset_z], dtype=np.float64)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Combined 3×3 correction, soft_iron @ diag(scale)."""
+        m = np.diag([self.scale_x, self.scale_y, self.scale_z]).astype(np.float64)
+        if self.soft_iron is not None:
+            m = np.asarray(self.soft_iron, dtype=np.float64) @ m
+        return m
 
 
 @dataclass
@@ -35,11 +58,15 @@ class AccelerometerCalibration:
     Attributes:
         offset_x/y/z: Offset for each axis
         sensitivity: mg per LSB (ADXL345 at ±16g, full resolution: 3.9 mg/LSB)
+        offset_std: 1σ uncertainty of each offset (LSB)
+        sensitivity_std: 1σ uncertainty of the sensitivity (mg per LSB)
     """
     offset_x: float = 0.0
     offset_y: float = 0.0
     offset_z: float = 0.0
     sensitivity: float = 3.9  # mg per LSB
+    offset_std: float = 0.0
+    sensitivity_std: float = 0.0
 
 
 # Default calibrations (replace with measured values)
@@ -52,7 +79,81 @@ DEFAULT_MAG_CAL = {
 DEFAULT_ACCEL_CAL = AccelerometerCalibration()
 
 
-def apply_calibration(df: pd.DataFrame, calibrations: dict = None) -> pd.DataFrame:
+MAG_SENSORS = ['m1', 'm2', 'm3']
+
+
+def calibration_arrays(calibrations: dict,
+                       sensors: Sequence[str],
+                       units: str = 'uT') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack calibrations into arrays for calibrate_array().
+
+    Parameters:
+        calibrations: Dict mapping sensor names to MagnetometerCalibration
+        sensors: Sensor order of the stacked arrays
+        units: 'uT' to include the LSB → μT conversion, 'lsb' to stay in
+               corrected counts
+
+    Returns:
+        Tuple of (offsets (S, 3), matrices (S, 3, 3))
+    """
+    offsets = np.stack([calibrations[s].offset for s in sensors])
+    matrices = np.stack([calibrations[s].matrix for s in sensors])
+    if units == 'uT':
+        # 1 Gauss = 100 μT, sensitivity is in LSB/Gauss
+        sens = np.array([calibrations[s].sensitivity for s in sensors]) / 100
+        matrices = matrices / sens[:, None, None]
+    elif units != 'lsb':
+        raise ValueError(f"Unknown units: {units}")
+    return offsets, matrices
+
+
+def calibrate_array(raw: np.ndarray,
+                    offsets: np.ndarray,
+                    matrices: np.ndarray,
+                    out: Optional[np.ndarray] = None,
+                    mag_out: Optional[np.ndarray] = None,
+                    dtype=np.float32,
+                    block_rows: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calibrate all magnetometers at once.
+
+    Computes out[n, s] = matrices[s] @ (raw[n, s] - offsets[s]) with one
+    einsum per block of rows, and the field magnitudes in the same pass.
+    Working in blocks keeps temporaries small on long runs.
+
+    Parameters:
+        raw: Raw readings, shape (N, S, 3)
+        offsets: Hard iron offsets, shape (S, 3)
+        matrices: Correction matrices, shape (S, 3, 3)
+        out: Optional preallocated (N, S, 3) output
+        mag_out: Optional preallocated (N, S) magnitude output
+        dtype: Output dtype when buffers are allocated here
+        block_rows: Rows processed per block
+
+    Returns:
+        Tuple of (calibrated (N, S, 3), magnitudes (N, S))
+    """
+    n = raw.shape[0]
+    if out is None:
+        out = np.empty(raw.shape, dtype=dtype)
+    if mag_out is None:
+        mag_out = np.empty(raw.shape[:2], dtype=out.dtype)
+
+    offsets = offsets.astype(out.dtype)
+    matrices = matrices.astype(out.dtype)
+
+    for i in range(0, n, block_rows):
+        block = raw[i:i + block_rows].astype(out.dtype) - offsets
+        np.einsum('sij,nsj->nsi', matrices, block, out=out[i:i + block_rows])
+        cal = out[i:i + block_rows]
+        np.sqrt(np.einsum('nsi,nsi->ns', cal, cal), out=mag_out[i:i + block_rows])
+
+    return out, mag_out
+
+
+def apply_calibration(df: pd.DataFrame, calibrations: dict = None,
+                      dtype=np.float32) -> pd.DataFrame:
     """
     Apply calibration to magnetometer data.
     Converts LSB to microtesla (μT).
@@ -60,6 +161,7 @@ def apply_calibration(df: pd.DataFrame, calibrations: dict = None) -> pd.DataFra
     Parameters:
         df: DataFrame with magnetometer columns (m1x, m1y, m1z, etc.)
         calibrations: Dict mapping sensor names to MagnetometerCalibration objects
+        dtype: dtype of the calibrated columns
 
     Returns:
         DataFrame with additional calibrated columns (*_uT)
@@ -67,9 +169,31 @@ def apply_calibration(df: pd.DataFrame, calibrations: dict = None) -> pd.DataFra
     if calibrations is None:
         calibrations = DEFAULT_MAG_CAL
 
-    df_cal = df.copy()
-
+    sensors = [s for s in calibrations
+               if all(f'{s}{ax}' in df.columns for ax in 'xyz')]
+    new_cols = {}
+
+    if sensors:
+        raw = np.stack([df[[f'{s}{ax}' for ax in 'xyz']].to_numpy() for s in sensors], axis=1)
+        offsets, matrices = calibration_arrays(calibrations, sensors, units='lsb')
+        cal, mag = calibrate_array(raw, offsets, matrices, dtype=dtype)
+
+        # 1 Gauss = 100 μT, sensitivity is in LSB/Gauss
+        sens = np.array([calibrations[s].sensitivity for s in sensors]) / 100
+        inv_sens = (1 / sens).astype(cal.dtype)
+        uT = cal * inv_sens[:, None]
+        mag *= inv_sens
+        for i, sensor in enumerate(sensors):
+            for j, axis in enumerate('xyz'):
+                new_cols[f'{sensor}{axis}_cal'] = cal[:, i, j]
+                new_cols[f'{sensor}{axis}_uT'] = uT[:, i, j]
+
+    # Sensors with missing axes can only take the per-axis correction
     for sensor, cal in calibrations.items():
+        if sensor in sensors:
+            continue
+        if cal.soft_iron is not None:
+            raise ValueError(f"Soft iron matrix for {sensor} needs all three axes")
         for axis in ['x', 'y', 'z']:
             col = f'{sensor}{axis}'
             if col not in df.columns:
@@ -78,20 +202,18 @@ def apply_calibration(df: pd.DataFrame, calibrations: dict = None) -> pd.DataFra
             offset = getattr(cal, f'offset_{axis}')
             scale = getattr(cal, f'scale_{axis}')
 
-            # Apply offset and scale
-            df_cal[f'{col}_cal'] = (df[col] - offset) * scale
-
-            # Convert to microtesla
-            # 1 Gauss = 100 μT, sensitivity is in LSB/Gauss
-            df_cal[f'{col}_uT'] = df_cal[f'{col}_cal'] / (cal.sensitivity / 100)
+            # Apply offset and scale, then convert to microtesla
+            new_cols[f'{col}_cal'] = ((df[col] - offset) * scale).to_numpy(dtype)
+            new_cols[f'{col}_uT'] = new_cols[f'{col}_cal'] / (cal.sensitivity / 100)
 
-    # Recalculate magnitudes in physical units
-    for sensor in ['m1', 'm2', 'm3']:
-        cols_uT = [f'{sensor}{ax}_uT' for ax in 'xyz']
-        if all(c in df_cal.columns for c in cols_uT):
-            df_cal[f'{sensor}_mag_uT'] = np.sqrt(sum(df_cal[c]**2 for c in cols_uT))
+    # Magnitudes in physical units
+    for i, sensor in enumerate(sensors):
+        if sensor in MAG_SENSORS:
+            new_cols[f'{sensor}_mag_uT'] = mag[:, i]
 
-    return df_cal
+    # Recalibrating replaces the previous columns instead of duplicating them
+    df = df.drop(columns=list(new_cols), errors='ignore')
+    return pd.concat([df, pd.DataFrame(new_cols, index=df.index)], axis=1)
 
 
 def apply_accel_calibration(df: pd.DataFrame, cal: AccelerometerCalibration = None) -> pd.DataFrame:
@@ -132,20 +254,301 @@ def apply_accel_calibration(df: pd.DataFrame, cal: AccelerometerCalibration = No
     return df_cal
 
 
-def calibrate_from_tumble(data: pd.DataFrame, sensor: str) -> MagnetometerCalibration:
+# Robust scale estimate: histogram of relative radial residuals
+_RESIDUAL_BINS = 10000
+_RESIDUAL_MAX = 1.0
+
+# Tuning constants for 95% efficiency on Gaussian residuals
+_ROBUST_TUNING = {'huber': 1.345, 'tukey': 4.685}
+
+
+class EllipsoidFitter:
+    """
+    Streaming least-squares fit of an ellipsoid (or sphere) to 3-axis data.
+
+    The normal equations of the algebraic fit are accumulated chunk by
+    chunk, so memory does not grow with the length of the tumble. Points
+    are centred and scaled by the first chunk to keep the equations well
+    conditioned. The weighted residual sum of squares is accumulated
+    alongside, so uncertainty() can estimate the parameter covariance.
+
+    Parameters:
+        sphere: Fit only a centre and radius (gravity/field sphere)
+    """
+
+    def __init__(self, sphere: bool = False):
+        self.sphere = sphere
+        n = 4 if sphere else 9
+        self._ata = np.zeros((n, n))
+        self._atb = np.zeros(n)
+        self._btb = 0.0
+        self._origin = None
+        self._scale = 1.0
+        self.count = 0
+
+    def _design(self, u: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        x, y, z = u.T
+        if self.sphere:
+            # |u|² = 2 c·u + (R² - |c|²)
+            return np.column_stack([2 * x, 2 * y, 2 * z, np.ones_like(x)]), (u * u).sum(axis=1)
+        # A x² + B y² + C z² + 2D xy + 2E xz + 2F yz + 2G x + 2H y + 2I z = 1
+        a = np.column_stack([x * x, y * y, z * z, 2 * x * y, 2 * x * z, 2 * y * z,
+                             2 * x, 2 * y, 2 * z])
+        return a, np.ones_like(x)
+
+    def update(self, xyz: np.ndarray, weights: Optional[np.ndarray] = None):
+        """
+        Add points to the fit.
+
+        Parameters:
+            xyz: Points, shape (N, 3); rows with NaN are ignored
+            weights: Optional per-point weights, shape (N,)
+        """
+        xyz = np.asarray(xyz, dtype=np.float64)
+        valid = np.isfinite(xyz).all(axis=1)
+        xyz = xyz[valid]
+        if len(xyz) == 0:
+            return
+
+        if self._origin is None:
+            self._origin = xyz.mean(axis=0)
+            spread = np.sqrt(((xyz - self._origin) ** 2).sum(axis=1).mean())
+            self._scale = spread if spread > 0 else 1.0
+
+        a, b = self._design((xyz - self._origin) / self._scale)
+        w = np.ones(len(b)) if weights is None else np.asarray(weights, dtype=np.float64)[valid]
+        aw = a * w[:, None]
+        self._ata += aw.T @ a
+        self._atb += aw.T @ b
+        self._btb += (w * b) @ b
+        self.count += len(xyz)
+
+    def solve(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Solve the accumulated normal equations.
+
+        Returns:
+            Tuple of (centre (3,), shape matrix M (3, 3)) in input units,
+            with (x - centre)ᵀ M (x - centre) = 1 on the fitted surface
+        """
+        if self.count < len(self._atb):
+            raise ValueError(f"Need at least {len(self._atb)} points, got {self.count}")
+
+        p = np.linalg.lstsq(self._ata, self._atb, rcond=None)[0]
+        centre, m = self._shape(p)
+        return self._origin + self._scale * centre, m / self._scale ** 2
+
+    def _shape(self, p: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Centre and shape matrix, in normalized units, of fit parameters p."""
+        if self.sphere:
+            centre = p[:3]
+            r2 = p[3] + centre @ centre
+            if r2 <= 0:
+                raise ValueError("Sphere fit failed")
+            m = np.eye(3) / r2
+        else:
+            a, b, c, d, e, f = p[:6]
+            q = np.array([[a, d, e], [d, b, f], [e, f, c]])
+            centre = -np.linalg.solve(q, p[6:])
+            m = q / (1 + centre @ q @ centre)
+            if np.any(np.linalg.eigvalsh(m) <= 0):
+                raise ValueError("Fit is not an ellipsoid; does the tumble cover all orientations?")
+        return centre, m
+
+    def uncertainty(self, n_draws: int = 500, seed: Optional[int] = 0) -> dict:
+        """
+        1σ uncertainties of the fitted centre and radii.
+
+        The parameter covariance is s² (AᵀWA)⁻¹, with s² the residual
+        variance of the algebraic fit. Parameters are drawn from it and
+        each draw is mapped to a centre and principal radii like solve()
+        does, which handles the non-linear mapping without derivatives.
+
+        Parameters:
+            n_draws: Parameter draws
+            seed: Seed of the draws
+
+        Returns:
+            Dict with 'centre_std' (3,) in input units, 'radius_std' (3,)
+            relative std of the principal radii (smallest first), and
+            'residual_std' of the algebraic fit
+        """
+        n_p = len(self._atb)
+        if self.count <= n_p:
+            raise ValueError(f"Need more than {n_p} points, got {self.count}")
+        p = np.linalg.lstsq(self._ata, self._atb, rcond=None)[0]
+        rss = max(self._btb - 2 * p @ self._atb + p @ self._ata @ p, 0.0)
+        s2 = rss / (self.count - n_p)
+        cov = s2 * np.linalg.pinv(self._ata)
+
+        centre, m = self._shape(p)
+        radii = np.linalg.eigvalsh(m) ** -0.5
+        draws = np.random.default_rng(seed).multivariate_normal(p, cov, n_draws, method='eigh')
+        centres, rel = [], []
+        for q in draws:
+            try:
+                c, mq = self._shape(q)
+            except (ValueError, np.linalg.LinAlgError):
+                continue
+            centres.append(c)
+            rel.append(np.linalg.eigvalsh(mq) ** -0.5 / radii - 1)
+        if len(centres) < 2:
+            raise ValueError("Fit too uncertain to estimate its spread")
+        return {
+            'centre_std': self._scale * np.std(centres, axis=0, ddof=1),
+            'radius_std': np.std(rel, axis=0, ddof=1),
+            'residual_std': float(np.sqrt(s2)),
+        }
+
+
+def _chunk_source(data, passes: int):
+    """Callable returning a fresh iterable of chunks on each call."""
+    if isinstance(data, pd.DataFrame):
+        return lambda: [data]
+    if callable(data):
+        return data
+    if isinstance(data, (list, tuple)):
+        return lambda: data
+    if passes > 1:
+        raise ValueError("Robust fitting reads the data several times; pass a DataFrame, "
+                         "a list of chunks or a callable returning a chunk iterator")
+    return lambda: data
+
+
+def _radial_residuals(xyz: np.ndarray, centre: np.ndarray, m: np.ndarray) -> np.ndarray:
+    """Relative distance of each point from the fitted surface."""
+    d = xyz - centre
+    return np.sqrt(np.einsum('ni,ij,nj->n', d, m, d)) - 1
+
+
+def _robust_weights(r: np.ndarray, sigma: float, method: str) -> np.ndarray:
+    u = np.abs(r) / (_ROBUST_TUNING[method] * sigma)
+    if method == 'huber':
+        return np.minimum(1.0, 1.0 / np.maximum(u, 1e-12))
+    return np.where(u < 1, (1 - u ** 2) ** 2, 0.0)
+
+
+def fit_ellipsoid(data, columns: Sequence[str], sphere: bool = False,
+                  robust: Optional[str] = None,
+                  n_iter: int = 3,
+                  full_output: bool = False) -> tuple:
+    """
+    Fit an ellipsoid to streamed 3-axis data.
+
+    With robust set, each iteration makes one pass to estimate the residual
+    scale (MAD) of the current fit and one pass to refit with Huber or
+    Tukey bisquare weights, so outliers such as spikes lose their pull.
+
+    Use robust='tukey' when the data has spikes. Tukey weights drop points
+    far from the surface altogether, while Huber weights only bound their
+    pull: with 1% of spikes on a 500 LSB tumble, Huber still leaves an
+    offset bias of several LSB or more where Tukey leaves none. Huber
+    suits heavy-tailed noise without gross outliers.
+
+    Parameters:
+        data: DataFrame, list of DataFrame chunks, or a callable returning
+              an iterator of chunks (e.g. lambda: iter_experiment(path)).
+              A plain iterator is accepted when robust is None.
+        columns: The three columns to fit
+        sphere: Constrain the fit to a sphere
+        robust: None, 'huber' or 'tukey' (prefer 'tukey' for spikes)
+        n_iter: Reweighting iterations
+        full_output: Also return EllipsoidFitter.uncertainty() of the final fit
+
+    Returns:
+        Tuple of (centre (3,), shape matrix M (3, 3)), see EllipsoidFitter.solve,
+        plus the uncertainty dict if full_output is set
+    """
+    if robust is not None and robust not in _ROBUST_TUNING:
+        raise ValueError(f"Unknown robust method: {robust}")
+    source = _chunk_source(data, 1 + 2 * n_iter if robust else 1)
+    columns = list(columns)
+
+    fitter = EllipsoidFitter(sphere)
+    for chunk in source():
+        fitter.update(chunk[columns].to_numpy(dtype=np.float64))
+    centre, m = fitter.solve()
+
+    if robust is None:
+        return (centre, m, fitter.uncertainty()) if full_output else (centre, m)
+
+    for _ in range(n_iter):
+        counts = np.zeros(_RESIDUAL_BINS + 1, dtype=np.int64)
+        for chunk in source():
+            xyz = chunk[columns].to_numpy(dtype=np.float64)
+            r = np.abs(_radial_residuals(xyz, centre, m))
+            r = r[np.isfinite(r)]
+            idx = np.minimum((r * (_RESIDUAL_BINS / _RESIDUAL_MAX)).astype(np.int64), _RESIDUAL_BINS)
+            counts += np.bincount(idx, minlength=_RESIDUAL_BINS + 1)
+
+        median = (np.searchsorted(np.cumsum(counts), counts.sum() / 2) + 1) * _RESIDUAL_MAX / _RESIDUAL_BINS
+        sigma = 1.4826 * median
+
+        fitter = EllipsoidFitter(sphere)
+        for chunk in source():
+            xyz = chunk[columns].to_numpy(dtype=np.float64)
+            fitter.update(xyz, _robust_weights(_radial_residuals(xyz, centre, m), sigma, robust))
+        centre, m = fitter.solve()
+
+    return (centre, m, fitter.uncertainty()) if full_output else (centre, m)
+
+
+def calibrate_from_tumble(data, sensor: str, method: str = 'minmax',
+                          robust: Optional[str] = None,
+                          n_iter: int = 3) -> MagnetometerCalibration:
     """
     Calculate calibration from tumble test data.
 
-    During tumble test, sensor is rotated through all orientations.
-    Min/max values give offset and scale.
+    During tumble test, sensor is rotated through all orientations, so
+    the readings lie on an ellipsoid. The default 'minmax' method takes
+    offset and scale from per-axis min/max. Pass method='ellipsoid' to
+    fit the ellipsoid by least squares instead, which returns the hard
+    iron offset and the full soft iron matrix mapping it onto a sphere
+    of the same mean radius.
+
+    offset_std and scale_std are filled in from the data: for the
+    ellipsoid, from the fit covariance (EllipsoidFitter.uncertainty());
+    for min/max, from how far its offsets and half ranges are from
+    those of an ellipsoid fit to the same data (noise at the extremes
+    and orientations the tumble missed). sensitivity_std is left at 0
+    since the tumble does not measure the sensitivity.
 
     Parameters:
-        data: DataFrame containing tumble test data
+        data: DataFrame containing tumble test data, or chunks as
+              accepted by fit_ellipsoid()
         sensor: Sensor prefix (e.g., 'm1')
+        method: 'minmax' or 'ellipsoid'
+        robust: Reweighting for the ellipsoid fit (None, 'huber', 'tukey');
+                'tukey' for data with spikes, see fit_ellipsoid()
+        n_iter: Reweighting iterations
 
     Returns:
         MagnetometerCalibration with calculated parameters
     """
+    columns = [f'{sensor}{axis}' for axis in 'xyz']
+
+    if method == 'ellipsoid':
+        centre, m, err = fit_ellipsoid(data, columns, robust=robust, n_iter=n_iter,
+                                       full_output=True)
+        # Symmetric square root of M, scaled to keep the mean radius in LSB
+        w, v = np.linalg.eigh(m)
+        radius = np.prod(w) ** (-1 / 6)
+        soft_iron = radius * (v * np.sqrt(w)) @ v.T
+        return MagnetometerCalibration(
+            offset_x=float(centre[0]),
+            offset_y=float(centre[1]),
+            offset_z=float(centre[2]),
+            soft_iron=soft_iron,
+            # One std per calibration: RMS over the axes
+            offset_std=float(np.sqrt(np.mean(err['centre_std'] ** 2))),
+            scale_std=float(np.sqrt(np.mean(err['radius_std'] ** 2)))
+        )
+    if method != 'minmax':
+        raise ValueError(f"Unknown method: {method}")
+
+    if not isinstance(data, pd.DataFrame):
+        data = pd.concat(_chunk_source(data, 1)(), ignore_index=True)
+
     offsets = {}
     scales = {}
 
@@ -161,13 +564,63 @@ def calibrate_from_tumble(data: pd.DataFrame, sensor: str) -> MagnetometerCalibr
     avg_scale = np.mean(list(scales.values()))
     norm_scales = {ax: avg_scale / scales[ax] if scales[ax] != 0 else 1.0 for ax in 'xyz'}
 
+    # The ellipsoid fit uses every sample, not just the two extremes;
+    # the disagreement with it estimates the min/max error
+    offset_std = scale_std = 0.0
+    try:
+        centre, m = fit_ellipsoid(data, [f'{sensor}{ax}' for ax in 'xyz'])
+    except (ValueError, np.linalg.LinAlgError):
+        pass
+    else:
+        extent = np.sqrt(np.diag(np.linalg.inv(m)))
+        offset_std = float(np.sqrt(np.mean(
+            [(offsets[ax] - c) ** 2 for ax, c in zip('xyz', centre)])))
+        # Compare normalized scales, a common error in the ranges cancels
+        scale_std = float(np.sqrt(np.mean(
+            [(norm_scales[ax] * e / extent.mean() - 1) ** 2 for ax, e in zip('xyz', extent)])))
+
     return MagnetometerCalibration(
         offset_x=offsets['x'],
         offset_y=offsets['y'],
         offset_z=offsets['z'],
         scale_x=norm_scales['x'],
         scale_y=norm_scales['y'],
-        scale_z=norm_scales['z']
+        scale_z=norm_scales['z'],
+        offset_std=offset_std,
+        scale_std=scale_std
+    )
+
+
+def calibrate_accel_from_tumble(data, robust: Optional[str] = None,
+                                n_iter: int = 3) -> AccelerometerCalibration:
+    """
+    Calculate accelerometer calibration from a static tumble.
+
+    Readings taken at rest lie on a sphere of radius 1 g; a sphere fit
+    gives the offsets and the sensitivity (1000 mg / radius), and its
+    covariance their uncertainties.
+
+    Parameters:
+        data: DataFrame with ax, ay, az, or chunks as accepted by fit_ellipsoid()
+        robust: Reweighting (None, 'huber', 'tukey'); useful when the
+                tumble includes handling motion ('tukey' for spikes,
+                see fit_ellipsoid())
+        n_iter: Reweighting iterations
+
+    Returns:
+        AccelerometerCalibration with calculated parameters
+    """
+    centre, m, err = fit_ellipsoid(data, ['ax', 'ay', 'az'], sphere=True,
+                                   robust=robust, n_iter=n_iter, full_output=True)
+    radius = 1 / np.sqrt(m[0, 0])
+    sensitivity = 1000.0 / radius
+    return AccelerometerCalibration(
+        offset_x=float(centre[0]),
+        offset_y=float(centre[1]),
+        offset_z=float(centre[2]),
+        sensitivity=float(sensitivity),
+        offset_std=float(np.sqrt(np.mean(err['centre_std'] ** 2))),
+        sensitivity_std=float(sensitivity * err['radius_std'][0])
     )
 
 
@@ -182,8 +635,13 @@ def save_calibration(cal: MagnetometerCalibration, filepath: str):
         'scale_x': cal.scale_x,
         'scale_y': cal.scale_y,
         'scale_z': cal.scale_z,
-        'sensitivity': cal.sensitivity
+        'sensitivity': cal.sensitivity,
+        'offset_std': cal.offset_std,
+        'scale_std': cal.scale_std,
+        'sensitivity_std': cal.sensitivity_std
     }
+    if cal.soft_iron is not None:
+        data['soft_iron'] = np.asarray(cal.soft_iron).tolist()
 
     with open(filepath, 'w') as f:
         json.dump(data, f, indent=2)
@@ -196,4 +654,7 @@ def load_calibration(filepath: str) -> MagnetometerCalibration:
     with open(filepath, 'r') as f:
         data = json.load(f)
 
+    if data.get('soft_iron') is not None:
+        data['soft_iron'] = np.array(data['soft_iron'])
+
     return MagnetometerCalibration(**data)
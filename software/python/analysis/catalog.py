@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+catalog.py - SQLite index of experiment files
+
+Scans a data tree once, storing the metadata parsed from each filename
+together with its validate_data() quality metrics, so runs can be
+selected without re-loading any data:
+
+    with ExperimentCatalog('data/catalog.sqlite') as catalog:
+        catalog.update('data/raw')
+        files = catalog.query(protocol='CV', voltage_kv=20,
+                              frequency_hz=(100, None))
+
+Re-running update() only re-validates new or changed files and drops
+files that no longer exist.
+"""
+
+import json
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from .data_loader import iter_experiment, parse_metadata, validate_data
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    filepath TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    test_id TEXT,
+    protocol TEXT,
+    date TEXT,
+    frequency_hz REAL,
+    voltage_kv REAL,
+    amplitude_pct REAL,
+    duration_s REAL,
+    notes TEXT,
+    sample_rate_hz REAL,
+    sample_count INTEGER,
+    timestamp_gaps INTEGER,
+    nan_count INTEGER,
+    saturated_count INTEGER,
+    quality TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_protocol ON experiments (protocol);
+CREATE INDEX IF NOT EXISTS idx_frequency ON experiments (frequency_hz);
+CREATE INDEX IF NOT EXISTS idx_voltage ON experiments (voltage_kv);
+"""
+
+# Columns that can be used as query() filters
+QUERY_FIELDS = (
+    'test_id', 'protocol', 'date', 'frequency_hz', 'voltage_kv',
+    'amplitude_pct', 'duration_s', 'sample_rate_hz', 'sample_count',
+    'timestamp_gaps', 'nan_count', 'saturated_count',
+)
+
+_COLUMNS = (
+    'filepath', 'size', 'mtime_ns', 'test_id', 'protocol', 'date',
+    'frequency_hz', 'voltage_kv', 'amplitude_pct', 'duration_s', 'notes',
+    'sample_rate_hz', 'sample_count', 'timestamp_gaps', 'nan_count',
+    'saturated_count', 'quality',
+)
+
+
+def _index_file(filepath: str) -> tuple:
+    """Build the catalog row for one file (runs in a worker process)."""
+    path = Path(filepath)
+    st = path.stat()
+    metadata = parse_metadata(filepath)
+    quality = validate_data(iter_experiment(filepath))
+
+    saturated = sum(v for k, v in quality.items() if k.endswith('_saturated'))
+    duration = metadata.duration_s
+    if duration is None:
+        duration = quality['duration_s']
+
+    return (
+        str(path), st.st_size, st.st_mtime_ns,
+        metadata.test_id, metadata.protocol, metadata.date,
+        metadata.frequency_hz, metadata.voltage_kv, metadata.amplitude_pct,
+        duration, metadata.notes,
+        float(quality['sample_rate_hz']), quality['sample_count'],
+        quality['timestamp_gaps'], quality['nan_count'], saturated,
+        json.dumps({k: getattr(v, 'item', lambda: v)() for k, v in quality.items()}),
+    )
+
+
+class ExperimentCatalog:
+    """SQLite-backed index of experiment files and their quality metrics."""
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM experiments').fetchone()[0]
+
+    def update(self, root: str, pattern: str = '*.csv',
+               max_workers: Optional[int] = 1) -> dict:
+        """
+        Index new and changed files under root.
+
+        Files are matched by size and mtime against the existing index;
+        only those that differ are loaded and validated. A file that fails
+        to load is reported in 'errors' and dropped from the index, so it
+        is retried on the next update() rather than served with stale
+        metadata.
+
+        Parameters:
+            root: Data directory (searched recursively)
+            pattern: Filename pattern of data files
+            max_workers: Worker processes for validation (None = CPU count)
+
+        Returns:
+            Dict with counts of 'added', 'updated', 'removed', 'unchanged'
+            and a list of 'errors' as (filepath, message) tuples
+        """
+        root_path = Path(root).resolve()
+        files = sorted(str(p.resolve()) for p in root_path.rglob(pattern) if p.is_file())
+
+        # Prefix match without LIKE, where _ and % in directory names are wildcards
+        prefix = str(root_path) + os.sep
+        known = {
+            row['filepath']: (row['size'], row['mtime_ns'])
+            for row in self.conn.execute(
+                'SELECT filepath, size, mtime_ns FROM experiments '
+                'WHERE substr(filepath, 1, ?) = ?',
+                (len(prefix), prefix))
+        }
+
+        stale = []
+        for f in files:
+            st = os.stat(f)
+            if known.get(f) != (st.st_size, st.st_mtime_ns):
+                stale.append(f)
+
+        rows, errors = self._index(stale, max_workers)
+
+        removed = sorted(set(known) - set(files))
+        # A changed file that no longer indexes must not keep its old row
+        failed = [f for f, _ in errors if f in known]
+        with self.conn:
+            self.conn.executemany('DELETE FROM experiments WHERE filepath = ?',
+                                  [(f,) for f in removed + failed])
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO experiments ({', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(_COLUMNS))})", rows)
+
+        added = sum(1 for row in rows if row[0] not in known)
+        return {
+            'added': added,
+            'updated': len(rows) - added,
+            'removed': len(removed),
+            'unchanged': len(files) - len(stale),
+            'errors': errors,
+        }
+
+    def _index(self, filepaths: List[str], max_workers: Optional[int]):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = min(max_workers, len(filepaths))
+
+        rows, errors = [], []
+        if max_workers <= 1:
+            for f in filepaths:
+                try:
+                    rows.append(_index_file(f))
+                except Exception as e:
+                    errors.append((f, str(e)))
+            return rows, errors
+
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [(f, pool.submit(_index_file, f)) for f in filepaths]
+            for f, future in futures:
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    errors.append((f, str(e)))
+        return rows, errors
+
+    def _where(self, filters: dict) -> tuple:
+        clauses, params = [], []
+        for field, value in filters.items():
+            if field not in QUERY_FIELDS:
+                raise ValueError(f"Unknown query field: {field}")
+            if isinstance(value, tuple):
+                lo, hi = value
+                if lo is not None:
+                    clauses.append(f'{field} >= ?')
+                    params.append(lo)
+                if hi is not None:
+                    clauses.append(f'{field} <= ?')
+                    params.append(hi)
+            elif isinstance(value, (list, set)):
+                clauses.append(f"{field} IN ({', '.join('?' * len(value))})")
+                params.extend(value)
+            elif value is None:
+                clauses.append(f'{field} IS NULL')
+            else:
+                clauses.append(f'{field} = ?')
+                params.append(value)
+        where = ' WHERE ' + ' AND '.join(clauses) if clauses else ''
+        return where, params
+
+    def query(self, **filters) -> List[str]:
+        """
+        Select indexed files by metadata and quality fields.
+
+        Each keyword is a field from QUERY_FIELDS. A scalar matches
+        exactly, a list matches any of its values and a (min, max) tuple
+        is an inclusive range, with None leaving that end open.
+
+        Example:
+            catalog.query(protocol='CV', voltage_kv=20, frequency_hz=(100, None))
+
+        Returns:
+            Sorted list of file paths
+        """
+        where, params = self._where(filters)
+        rows = self.conn.execute(
+            f'SELECT filepath FROM experiments{where} ORDER BY filepath', params)
+        return [row['filepath'] for row in rows]
+
+    def records(self, **filters) -> List[dict]:
+        """
+        Like query(), but return the full catalog entry of each file.
+
+        The 'quality' entry is the validate_data() dict.
+        """
+        where, params = self._where(filters)
+        rows = self.conn.execute(
+            f'SELECT * FROM experiments{where} ORDER BY filepath', params)
+        records = []
+        for row in rows:
+            record = dict(row)
+            record['quality'] = json.loads(record['quality'])
+            records.append(record)
+        return records
@@ -3,11 +3,48 @@
 data_loader.py - Load and validate experimental data
 """
 
+import os
+import re
+import warnings
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional, Tuple
+from dataclasses import asdict, dataclass, fields
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .cache import open_cached_columns, read_csv_cached
+from .calibration import AccelerometerCalibration, MagnetometerCalibration
+from .quality import check_quality
+
+
+# Rows per chunk for the streaming API (~10 minutes at 100 Hz)
+DEFAULT_CHUNKSIZE = 65536
+
+MAG_COLUMNS = ['m1x', 'm1y', 'm1z', 'm2x', 'm2y', 'm2z', 'm3x', 'm3y', 'm3z']
+ACCEL_COLUMNS = ['ax', 'ay', 'az']
+
+# Binary log layout written by magnetometer_daq.ino with LOG_BINARY enabled:
+# a 16-byte header followed by packed little-endian SensorData records
+BINARY_MAGIC = b'PAISDAQ'
+BINARY_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u2'),
+    ('record_size', '<u2'),
+    ('sample_rate_hz', '<u2'),
+    ('reserved', '<u2'),
+])
+BINARY_SAMPLE_DTYPE = np.dtype(
+    [('timestamp_us', '<u4')] + [(col, '<i2') for col in MAG_COLUMNS + ACCEL_COLUMNS]
+)
+
+# HDF5 layout version and default rows per compressed chunk (~80 s at 100 Hz)
+HDF5_FORMAT_VERSION = 1
+HDF5_CHUNK_ROWS = 8192
+
+# The firmware timestamps with 32-bit micros(), which wraps every ~71.6 min
+MICROS_WRAP = 2**32
 
 
 @dataclass
@@ -24,22 +61,36 @@ class ExperimentMetadata:
     notes: str = ""
 
 
-def load_experiment(filepath: str) -> Tuple[pd.DataFrame, ExperimentMetadata]:
+# Optional filename tags after {Time}, e.g. CV_007_20240115_1520_100Hz_20kV_50pct.csv
+_TAG_UNITS = {
+    'hz': ('frequency_hz', 1.0),
+    'khz': ('frequency_hz', 1000.0),
+    'kv': ('voltage_kv', 1.0),
+    'pct': ('amplitude_pct', 1.0),
+    's': ('duration_s', 1.0),
+}
+_TAG_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)([a-z]+)$', re.IGNORECASE)
+
+
+def parse_metadata(filepath: str) -> ExperimentMetadata:
     """
-    Load experiment data and extract metadata from filename.
+    Extract experiment metadata from a data filename.
 
-    Filename format: {Protocol}_{TestID}_{Date}_{Time}.csv
+    Filename format: {Protocol}_{TestID}_{Date}_{Time}[_{Tag}...].csv
     Example: CV_007_20240115_1520.csv
 
+    Optional tags fill in the test conditions: {n}Hz or {n}kHz drive
+    frequency, {n}kV plate voltage, {n}pct drive amplitude and {n}s
+    duration, e.g. CV_007_20240115_1520_100Hz_20kV.csv
+
     Parameters:
-        filepath: Path to CSV data file
+        filepath: Path to data file
 
     Returns:
-        Tuple of (DataFrame, ExperimentMetadata)
+        ExperimentMetadata
     """
     path = Path(filepath)
 
-    # Parse filename
     parts = path.stem.split('_')
     protocol = parts[0] if len(parts) > 0 else "UNKNOWN"
     test_id = parts[1] if len(parts) > 1 else "000"
@@ -52,17 +103,48 @@ def load_experiment(filepath: str) -> Tuple[pd.DataFrame, ExperimentMetadata]:
         filepath=str(path)
     )
 
-    # Load data
-    df = pd.read_csv(filepath)
+    for tag in parts[4:]:
+        match = _TAG_PATTERN.match(tag)
+        if match and match.group(2).lower() in _TAG_UNITS:
+            field, scale = _TAG_UNITS[match.group(2).lower()]
+            setattr(metadata, field, float(match.group(1)) * scale)
 
-    # Validate columns
-    required_cols = ['timestamp_us']
-    missing = set(required_cols) - set(df.columns)
-    if missing:
-        raise ValueError(f"Missing columns: {missing}")
+    return metadata
 
-    # Add derived columns
-    df['time_s'] = (df['timestamp_us'] - df['timestamp_us'].iloc[0]) / 1e6
+
+def unwrap_timestamps(timestamp_us: np.ndarray, previous: Optional[int] = None) -> np.ndarray:
+    """
+    Undo 32-bit micros() wraparound.
+
+    A backwards step of more than half the counter range is taken as a
+    wrap, and every later timestamp is shifted up by 2**32. Small
+    backwards steps (genuinely out-of-order samples) are left alone.
+
+    Parameters:
+        timestamp_us: Raw firmware timestamps
+        previous: Last unwrapped timestamp of the preceding chunk, when
+                  unwrapping a stream chunk by chunk
+
+    Returns:
+        Monotonic int64 timestamps in microseconds
+    """
+    ts = np.asarray(timestamp_us, dtype=np.int64)
+    if len(ts) == 0:
+        return ts
+
+    if previous is None:
+        base, raw_prev = 0, ts[0]
+    else:
+        raw_prev = previous % MICROS_WRAP
+        base = previous - raw_prev
+
+    wraps = np.cumsum(np.diff(ts, prepend=raw_prev) < -MICROS_WRAP // 2)
+    return ts + base + wraps * MICROS_WRAP
+
+
+def _add_derived_columns(df: pd.DataFrame, t0_us: float) -> pd.DataFrame:
+    """Add time_s and magnitude columns, with time measured from t0_us."""
+    df['time_s'] = (df['timestamp_us'] - t0_us) / 1e6
 
     # Calculate magnitude for each sensor
     for sensor in ['m1', 'm2', 'm3']:
@@ -74,15 +156,446 @@ def load_experiment(filepath: str) -> Tuple[pd.DataFrame, ExperimentMetadata]:
     if all(f'a{ax}' in df.columns for ax in 'xyz'):
         df['acc_mag'] = np.sqrt(df['ax']**2 + df['ay']**2 + df['az']**2)
 
+    return df
+
+
+def _check_columns(df: pd.DataFrame):
+    """Raise ValueError if required columns are missing."""
+    required_cols = ['timestamp_us']
+    missing = set(required_cols) - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+
+
+class BinaryLog:
+    """
+    Memory-mapped raw binary DAQ log (.bin).
+
+    Nothing is read until accessed: channels are zero-copy views into
+    the mapped file and time slicing only touches the pages it needs.
+
+    Example:
+        log = BinaryLog('LOG003.BIN')
+        window = log.time_slice(120, 150)
+        m1x = window['m1x']
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = str(filepath)
+
+        header = np.fromfile(self.filepath, dtype=BINARY_HEADER_DTYPE, count=1)
+        if len(header) == 0 or not header['magic'][0].startswith(BINARY_MAGIC):
+            raise ValueError(f"Not a binary DAQ log: {self.filepath}")
+        if header['record_size'][0] != BINARY_SAMPLE_DTYPE.itemsize:
+            raise ValueError(f"Unsupported record size {header['record_size'][0]} "
+                             f"in {self.filepath}")
+
+        self.version = int(header['version'][0])
+        self.sample_rate_hz = float(header['sample_rate_hz'][0])
+
+        # A log cut off mid-write may end in a partial record; ignore it
+        offset = BINARY_HEADER_DTYPE.itemsize
+        n_samples = (Path(self.filepath).stat().st_size - offset) // BINARY_SAMPLE_DTYPE.itemsize
+        if n_samples > 0:
+            self.samples = np.memmap(self.filepath, dtype=BINARY_SAMPLE_DTYPE, mode='r',
+                                     offset=offset, shape=(n_samples,))
+        else:
+            self.samples = np.empty(0, dtype=BINARY_SAMPLE_DTYPE)
+
+        self._segments = None
+
+    @property
+    def columns(self) -> list:
+        return list(BINARY_SAMPLE_DTYPE.names)
+
+    def segment_starts(self, block_size: int = 1 << 20) -> np.ndarray:
+        """
+        Sample indices where each micros() wrap segment begins.
+
+        Found by one blockwise scan of the timestamps the first time it
+        is needed; segment k holds raw timestamps offset by k * 2**32.
+        """
+        if self._segments is None:
+            ts = self.samples['timestamp_us']
+            starts = [0]
+            prev = None
+            for i in range(0, len(ts), block_size):
+                block = ts[i:i + block_size].astype(np.int64)
+                d = np.diff(block, prepend=block[0] if prev is None else prev)
+                starts.extend((np.flatnonzero(d < -MICROS_WRAP // 2) + i).tolist())
+                prev = block[-1]
+            self._segments = np.array(starts, dtype=np.int64)
+        return self._segments
+
+    def _unwrapped_index(self, value_us: int) -> int:
+        """Index of the first sample with unwrapped timestamp >= value_us."""
+        starts = self.segment_starts()
+        seg = value_us // MICROS_WRAP
+        if seg < 0:
+            return 0
+        if seg >= len(starts):
+            return len(self.samples)
+        lo = starts[seg]
+        hi = starts[seg + 1] if seg + 1 < len(starts) else len(self.samples)
+        ts = self.samples['timestamp_us']
+        return int(lo + np.searchsorted(ts[lo:hi], value_us - seg * MICROS_WRAP))
+
+    def timestamps(self, i0: int = 0, i1: Optional[int] = None) -> np.ndarray:
+        """Unwrapped int64 timestamps of samples [i0, i1)."""
+        raw = self.samples['timestamp_us'][i0:i1]
+        seg = np.searchsorted(self.segment_starts(), i0, side='right') - 1
+        return unwrap_timestamps(raw) + seg * MICROS_WRAP
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """Zero-copy view of one channel."""
+        return self.samples[column]
+
+    def index_range(self, t_start: float, t_end: float) -> Tuple[int, int]:
+        """
+        Sample index range [i0, i1) covering t_start <= time_s < t_end.
+
+        Uses a binary search on the mapped timestamps, so only a few
+        pages of the file are read (after a one-off scan for micros()
+        wraps, see segment_starts()).
+        """
+        if len(self.samples) == 0:
+            return 0, 0
+        t0 = int(self.samples['timestamp_us'][0])
+        i0 = self._unwrapped_index(int(np.ceil(t0 + t_start * 1e6)))
+        i1 = self._unwrapped_index(int(np.ceil(t0 + t_end * 1e6)))
+        return i0, i1
+
+    def time_slice(self, t_start: float, t_end: float) -> np.ndarray:
+        """Zero-copy structured view of samples with t_start <= time_s < t_end."""
+        i0, i1 = self.index_range(t_start, t_end)
+        return self.samples[i0:i1]
+
+    def to_dataframe(self, t_range: Optional[Tuple[float, float]] = None) -> pd.DataFrame:
+        """
+        Materialise samples as a DataFrame with the usual derived columns.
+
+        Parameters:
+            t_range: Optional (start, end) in seconds to load only a window
+
+        Returns:
+            DataFrame as returned by load_experiment()
+        """
+        i0, i1 = (0, len(self.samples)) if t_range is None else self.index_range(*t_range)
+        samples = self.samples[i0:i1]
+        df = pd.DataFrame({col: _to_native(samples[col]) for col in self.columns},
+                          index=pd.RangeIndex(i0, i1))
+        df['timestamp_us'] = self.timestamps(i0, i1)
+        t0_us = int(self.samples['timestamp_us'][0]) if len(self.samples) else 0
+        return _add_derived_columns(df, t0_us)
+
+
+def _is_binary_log(filepath: str) -> bool:
+    return Path(filepath).suffix.lower() == '.bin'
+
+
+def _is_hdf5(filepath: str) -> bool:
+    return Path(filepath).suffix.lower() in ('.h5', '.hdf5')
+
+
+def _import_h5py():
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("HDF5 support requires h5py. Run: pip install h5py") from None
+    return h5py
+
+
+def _set_attrs(attrs, obj):
+    """Store dataclass fields as HDF5 attributes, skipping unset values."""
+    for key, value in asdict(obj).items():
+        if value is not None:
+            attrs[key] = value
+
+
+def export_hdf5(data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                filepath: str,
+                metadata: Optional[ExperimentMetadata] = None,
+                calibrations: Optional[dict] = None,
+                accel_calibration: Optional[AccelerometerCalibration] = None,
+                chunk_rows: int = HDF5_CHUNK_ROWS,
+                compression: str = 'gzip',
+                compression_level: int = 4):
+    """
+    Export experiment data to HDF5.
+
+    Each numeric column becomes a chunked, compressed dataset under
+    /channels. /time_index holds time_s at the start of every chunk so
+    load_hdf5() can read a time window by decompressing only the chunks
+    it overlaps. Metadata and calibrations are stored as attributes.
+
+    Parameters:
+        data: DataFrame with 'time_s', or iterable of chunks (e.g. from
+              iter_experiment()) to export in constant memory
+        filepath: Output .h5 file
+        metadata: ExperimentMetadata stored as root attributes
+        calibrations: Dict of sensor name to MagnetometerCalibration,
+                      stored under /calibration/<sensor>
+        accel_calibration: AccelerometerCalibration, stored under
+                           /calibration/accel
+        chunk_rows: Rows per compressed chunk
+        compression: h5py compression filter ('gzip', 'lzf' or None)
+        compression_level: gzip level (0-9)
+    """
+    h5py = _import_h5py()
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    opts = {'compression': compression, 'shuffle': compression is not None}
+    if compression == 'gzip':
+        opts['compression_opts'] = compression_level
+
+    with h5py.File(filepath, 'w') as f:
+        f.attrs['format'] = 'pais-daq'
+        f.attrs['version'] = HDF5_FORMAT_VERSION
+        f.attrs['chunk_rows'] = chunk_rows
+        if metadata is not None:
+            _set_attrs(f.attrs, metadata)
+
+        cal_group = f.create_group('calibration')
+        for sensor, cal in (calibrations or {}).items():
+            _set_attrs(cal_group.create_group(sensor).attrs, cal)
+        if accel_calibration is not None:
+            _set_attrs(cal_group.create_group('accel').attrs, accel_calibration)
+
+        group = f.create_group('channels')
+        columns = None
+        time_index = []
+        n = 0
+
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            if columns is None:
+                columns = [c for c in chunk.columns
+                           if np.issubdtype(chunk[c].dtype, np.number)
+                           or chunk[c].dtype == bool]
+                for col in columns:
+                    group.create_dataset(col, shape=(0,), maxshape=(None,),
+                                         dtype=chunk[col].dtype, chunks=(chunk_rows,), **opts)
+
+            m = len(chunk)
+            for col in columns:
+                ds = group[col]
+                ds.resize((n + m,))
+                ds[n:n + m] = chunk[col].to_numpy()
+
+            # time_s of each row that starts a storage chunk
+            first = -(-n // chunk_rows) * chunk_rows
+            time_index.extend(chunk['time_s'].to_numpy()[first - n::chunk_rows].tolist())
+            n += m
+
+        f.attrs['n_samples'] = n
+        f.attrs['columns'] = columns or []
+        f.create_dataset('time_index', data=np.asarray(time_index, dtype=np.float64))
+
+
+def read_hdf5_metadata(filepath: str) -> ExperimentMetadata:
+    """Read the ExperimentMetadata stored by export_hdf5()."""
+    h5py = _import_h5py()
+    with h5py.File(filepath, 'r') as f:
+        attrs = dict(f.attrs)
+
+    metadata = parse_metadata(filepath)
+    for field in fields(ExperimentMetadata):
+        if field.name in attrs and field.name != 'filepath':
+            value = attrs[field.name]
+            setattr(metadata, field.name, value.item() if hasattr(value, 'item') else value)
+    return metadata
+
+
+def read_hdf5_calibration(filepath: str) -> Tuple[dict, Optional[AccelerometerCalibration]]:
+    """
+    Read the calibrations stored by export_hdf5().
+
+    Returns:
+        Tuple of (dict of sensor to MagnetometerCalibration,
+        AccelerometerCalibration or None)
+    """
+    h5py = _import_h5py()
+    mag, accel = {}, None
+    with h5py.File(filepath, 'r') as f:
+        for name, group in f.get('calibration', {}).items():
+            attrs = {k: (v.item() if np.ndim(v) == 0 else np.asarray(v))
+                     for k, v in group.attrs.items()}
+            if name == 'accel':
+                accel = AccelerometerCalibration(**attrs)
+            else:
+                mag[name] = MagnetometerCalibration(**attrs)
+    return mag, accel
+
+
+def load_hdf5(filepath: str,
+              t_range: Optional[Tuple[float, float]] = None,
+              columns: Optional[Sequence[str]] = None) -> Tuple[pd.DataFrame, ExperimentMetadata]:
+    """
+    Load experiment data exported with export_hdf5().
+
+    Parameters:
+        filepath: Path to .h5 file
+        t_range: Optional (start, end) in seconds; only the storage
+                 chunks overlapping start <= time_s < end are read
+        columns: Columns to load (default: all)
+
+    Returns:
+        Tuple of (DataFrame, ExperimentMetadata)
+    """
+    h5py = _import_h5py()
+    with h5py.File(filepath, 'r') as f:
+        group = f['channels']
+        n = int(f.attrs['n_samples'])
+        chunk_rows = int(f.attrs['chunk_rows'])
+        if columns is None:
+            columns = [str(c) for c in f.attrs['columns']]
+
+        i0, i1 = 0, n
+        if t_range is not None and n > 0:
+            # Coarse bounds from the chunk index, then refine within them
+            time_index = f['time_index'][:]
+            k0 = max(np.searchsorted(time_index, t_range[0], side='right') - 1, 0)
+            k1 = np.searchsorted(time_index, t_range[1], side='left')
+            lo, hi = k0 * chunk_rows, min(k1 * chunk_rows, n)
+            t = group['time_s'][lo:hi]
+            i0 = lo + int(np.searchsorted(t, t_range[0], side='left'))
+            i1 = lo + int(np.searchsorted(t, t_range[1], side='left'))
+
+        df = pd.DataFrame({col: group[col][i0:i1] for col in columns},
+                          index=pd.RangeIndex(i0, i1))
+
+    return df, read_hdf5_metadata(filepath)
+
+
+def load_experiment(filepath: str,
+                    use_cache: bool = True,
+                    t_range: Optional[Tuple[float, float]] = None) -> Tuple[pd.DataFrame, ExperimentMetadata]:
+    """
+    Load experiment data and extract metadata from filename.
+
+    Filename format: {Protocol}_{TestID}_{Date}_{Time}.csv
+    Example: CV_007_20240115_1520.csv
+
+    Raw binary logs (.bin) from the DAQ firmware and HDF5 exports (.h5)
+    are also accepted. timestamp_us is unwrapped across micros() rollovers.
+
+    Parameters:
+        filepath: Path to CSV, binary or HDF5 data file
+        use_cache: Serve the parsed CSV from its columnar cache sidecar
+                   (see analysis.cache), writing it on first load
+        t_range: Optional (start, end) in seconds to return only that
+                 window; binary and HDF5 files read just the window
+
+    Returns:
+        Tuple of (DataFrame, ExperimentMetadata)
+    """
+    if _is_hdf5(filepath):
+        return load_hdf5(filepath, t_range)
+
+    metadata = parse_metadata(filepath)
+
+    if _is_binary_log(filepath):
+        return BinaryLog(filepath).to_dataframe(t_range), metadata
+
+    # Load data
+    df = read_csv_cached(filepath, use_cache)
+    _check_columns(df)
+
+    # Add derived columns
+    df['timestamp_us'] = unwrap_timestamps(df['timestamp_us'].to_numpy())
+    df = _add_derived_columns(df, df['timestamp_us'].iloc[0])
+
+    if t_range is not None:
+        i0, i1 = np.searchsorted(df['time_s'].to_numpy(), t_range, side='left')
+        df = df.iloc[i0:i1]
+
     return df, metadata
 
 
-def validate_data(df: pd.DataFrame) -> dict:
+def _to_native(arr: np.ndarray) -> np.ndarray:
+    """Copy a mapped column into memory, widening integers as read_csv would."""
+    return arr.astype(np.int64) if arr.dtype.kind in 'iu' else np.array(arr)
+
+
+def _raw_chunks(filepath: str, chunksize: int, use_cache: bool) -> Iterator[pd.DataFrame]:
+    """Yield raw file chunks, slicing the memory-mapped cache if available."""
+    if _is_hdf5(filepath):
+        h5py = _import_h5py()
+        with h5py.File(filepath, 'r') as f:
+            group = f['channels']
+            n = int(f.attrs['n_samples'])
+            columns = [str(c) for c in f.attrs['columns']]
+            for start in range(0, n, chunksize):
+                stop = min(start + chunksize, n)
+                yield pd.DataFrame({col: group[col][start:stop] for col in columns},
+                                   index=pd.RangeIndex(start, stop))
+        return
+
+    if _is_binary_log(filepath):
+        log = BinaryLog(filepath)
+        columns = {col: log[col] for col in log.columns}
+    else:
+        columns = open_cached_columns(filepath) if use_cache else None
+
+    if columns is None:
+        with pd.read_csv(filepath, chunksize=chunksize) as reader:
+            yield from reader
+        return
+
+    n = len(next(iter(columns.values()))) if columns else 0
+    for start in range(0, n, chunksize):
+        stop = min(start + chunksize, n)
+        yield pd.DataFrame({col: _to_native(arr[start:stop]) for col, arr in columns.items()},
+                           index=pd.RangeIndex(start, stop))
+
+
+def iter_experiment(filepath: str,
+                    chunksize: int = DEFAULT_CHUNKSIZE,
+                    use_cache: bool = True) -> Iterator[pd.DataFrame]:
+    """
+    Stream experiment data in fixed-size chunks.
+
+    Each chunk carries the same derived columns as load_experiment(),
+    with timestamps unwrapped and time_s measured from the first sample
+    of the file, so chunks can be processed in constant memory and the
+    results combined.
+
+    Parameters:
+        filepath: Path to CSV, binary or HDF5 data file
+        chunksize: Number of rows per chunk
+        use_cache: Read from an existing columnar cache if up to date
+
+    Yields:
+        DataFrame chunks in file order
+    """
+    t0_us = None
+    last_us = None
+
+    for chunk in _raw_chunks(filepath, chunksize, use_cache):
+        if len(chunk) == 0:
+            continue
+        if t0_us is None:
+            _check_columns(chunk)
+            t0_us = chunk['timestamp_us'].iloc[0]
+        chunk['timestamp_us'] = unwrap_timestamps(chunk['timestamp_us'].to_numpy(), last_us)
+        last_us = int(chunk['timestamp_us'].iloc[-1])
+        yield _add_derived_columns(chunk, t0_us)
+
+
+def validate_data(df: Union[pd.DataFrame, Iterable[pd.DataFrame]]) -> dict:
     """
     Perform data quality checks.
 
+    Accepts either a full DataFrame or an iterator of chunks from
+    iter_experiment(); the chunked path runs in constant memory and
+    gives identical results. See quality.check_quality() for the full
+    report with per-channel sample ranges.
+
     Parameters:
-        df: DataFrame with sensor data
+        df: DataFrame with sensor data, or iterable of DataFrame chunks
 
     Returns:
         Dict of quality metrics including:
@@ -90,39 +603,120 @@ def validate_data(df: pd.DataFrame) -> dict:
         - duration_s: Total duration
         - sample_count: Number of samples
         - timestamp_gaps: Number of timing gaps detected
-        - nan_count: Total NaN values
+        - out_of_order: Number of timestamps earlier than their predecessor
+        - duplicate_timestamps: Number of repeated timestamps
+        - nan_count: Total NaN values in all columns
+        - sensor_nan_count: NaN values in sensor channels only
+        - {channel}_saturated, _stuck, _spikes: Flagged samples per channel
     """
-    quality = {}
+    if isinstance(df, pd.DataFrame):
+        nan_total = int(df.isna().sum().sum())
+        report = check_quality(df)
+    else:
+        # Count NaN in every column as the chunks go past the quality checks
+        counts = []
 
-    # Check for gaps in timestamps
-    dt = np.diff(df['timestamp_us'])
-    expected_dt = np.median(dt)
-    gaps = np.sum(dt > 2 * expected_dt)
-    quality['timestamp_gaps'] = int(gaps)
-    quality['sample_rate_hz'] = 1e6 / expected_dt
+        def counted(chunks):
+            for chunk in chunks:
+                counts.append(int(chunk.isna().sum().sum()))
+                yield chunk
 
-    # Check for saturated values (HMC5883L saturates at ±2048)
-    for col in ['m1x', 'm1y', 'm1z', 'm2x', 'm2y', 'm2z', 'm3x', 'm3y', 'm3z']:
-        if col in df.columns:
-            saturated = np.sum(np.abs(df[col]) >= 2047)
-            quality[f'{col}_saturated'] = int(saturated)
+        report = check_quality(counted(df))
+        nan_total = sum(counts)
+
+    quality = {}
+    quality['timestamp_gaps'] = report['timestamp_gaps']
+    quality['sample_rate_hz'] = report['sample_rate_hz']
+    quality['out_of_order'] = report['out_of_order']
+    quality['duplicate_timestamps'] = report['duplicate_timestamps']
 
-    # Check for NaN values
-    quality['nan_count'] = int(df.isna().sum().sum())
+    for col, checks in report['channels'].items():
+        if col in MAG_COLUMNS:
+            quality[f'{col}_saturated'] = checks['saturated']
+    for col, checks in report['channels'].items():
+        quality[f'{col}_stuck'] = checks['stuck']
+        quality[f'{col}_spikes'] = checks['spikes']
 
-    # Duration
-    quality['duration_s'] = float(df['time_s'].iloc[-1])
-    quality['sample_count'] = len(df)
+    quality['nan_count'] = nan_total
+    quality['sensor_nan_count'] = sum(checks['nan'] for checks in report['channels'].values())
+    quality['duration_s'] = report['duration_s']
+    quality['sample_count'] = report['sample_count']
 
     return quality
 
 
-def load_multiple_experiments(filepaths: list) -> Tuple[list, list]:
+@dataclass
+class LoadResult:
+    """Outcome of loading one file with load_experiments()"""
+    filepath: str
+    data: Optional[pd.DataFrame] = None
+    metadata: Optional[ExperimentMetadata] = None
+    error_type: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error_type is None
+
+
+def _load_one(filepath: str, columns: Optional[Sequence[str]], use_cache: bool) -> LoadResult:
+    """Load a single file, capturing any failure in the result."""
+    try:
+        df, metadata = load_experiment(filepath, use_cache)
+        if columns is not None:
+            df = df[list(columns)]
+        return LoadResult(str(filepath), data=df, metadata=metadata)
+    except Exception as e:
+        return LoadResult(str(filepath), error_type=type(e).__name__, error=str(e))
+
+
+def load_experiments(filepaths: Sequence[str],
+                     max_workers: Optional[int] = None,
+                     columns: Optional[Sequence[str]] = None,
+                     use_cache: bool = True) -> List[LoadResult]:
+    """
+    Load many experiment files in parallel.
+
+    Files are loaded in a process pool; results come back in input
+    order and failures are reported per file rather than raised.
+
+    Parameters:
+        filepaths: List of file paths
+        max_workers: Number of worker processes (None = CPU count,
+                     1 = load in this process)
+        columns: Only return these columns (raw or derived), which cuts
+                 the data sent back from the workers
+        use_cache: Use the columnar CSV cache (see analysis.cache)
+
+    Returns:
+        List of LoadResult, one per input file
+    """
+    filepaths = list(filepaths)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(filepaths))
+
+    if max_workers <= 1:
+        return [_load_one(f, columns, use_cache) for f in filepaths]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(_load_one, filepaths, repeat(columns), repeat(use_cache)))
+
+
+def load_multiple_experiments(filepaths: list,
+                              max_workers: Optional[int] = 1,
+                              columns: Optional[Sequence[str]] = None) -> Tuple[list, list]:
     """
     Load multiple experiment files.
 
+    Files that fail to load are skipped with a warning; use
+    load_experiments() to get the per-file errors.
+
     Parameters:
         filepaths: List of file paths
+        max_workers: Number of worker processes (None = CPU count,
+                     default 1 = load in this process)
+        columns: Only return these columns
 
     Returns:
         Tuple of (list of DataFrames, list of ExperimentMetadata)
@@ -130,12 +724,11 @@ def load_multiple_experiments(filepaths: list) -> Tuple[list, list]:
     dataframes = []
     metadata_list = []
 
-    for filepath in filepaths:
-        try:
-            df, metadata = load_experiment(filepath)
-            dataframes.append(df)
-            metadata_list.append(metadata)
-        except Exception as e:
-            print(f"Warning: Failed to load {filepath}: {e}")
+    for result in load_experiments(filepaths, max_workers, columns):
+        if result.ok:
+            dataframes.append(result.data)
+            metadata_list.append(result.metadata)
+        else:
+            warnings.warn(f"Failed to load {result.filepath}: {result.error}")
 
     return dataframes, metadata_list
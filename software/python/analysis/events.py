@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+events.py - Jerk-triggered epoch extraction and averaging
+
+Protocol 5 applies acceleration transients to the plate. This module
+finds them from the jerk of the calibrated accelerometer signal and
+averages the magnetometer response around each onset:
+
+    result = event_average(df, pre_s=0.5, post_s=2.0)
+    result['mean'], result['ci_low'], result['ci_high']
+
+Onsets are found with array operations. epoch_windows() is a zero-copy
+strided view of every window of the data; extract_epochs() indexes it
+with the onsets, which copies the chosen epochs into a new array.
+average_epochs() never gathers epochs and loops over window offsets
+(hundreds) rather than over events (thousands).
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import signal, stats
+from typing import Optional, Sequence, Tuple
+
+from .data_loader import ACCEL_COLUMNS, MAG_COLUMNS
+from .signal_processing import _default_columns, sample_rate
+
+
+def compute_jerk(df: pd.DataFrame, fs: Optional[float] = None,
+                 columns: Optional[Sequence[str]] = None,
+                 window: int = 5) -> pd.DataFrame:
+    """
+    Jerk (time derivative of acceleration) of the accelerometer axes.
+
+    The derivative is a Savitzky-Golay fit over window samples, which
+    differentiates without amplifying sample-to-sample noise as much as
+    a plain difference.
+
+    Parameters:
+        df: DataFrame with accelerometer columns (calibrated *_ms2 if present)
+        fs: Sample rate in Hz (default: measured from time_s)
+        columns: Accelerometer columns (default: ax/ay/az, calibrated if present)
+        window: Savitzky-Golay window in samples (odd, >= 3)
+
+    Returns:
+        DataFrame with jx, jy, jz and jerk_mag, in m/s³ for calibrated
+        input (LSB/s otherwise)
+    """
+    fs = sample_rate(df, fs)
+    if columns is None:
+        columns = _default_columns(df, '_ms2', ACCEL_COLUMNS)
+    acc = df[list(columns)].to_numpy(dtype=np.float64)
+
+    jerk = signal.savgol_filter(acc, window, polyorder=2, deriv=1,
+                                delta=1 / fs, axis=0)
+    unit = '_ms3' if all(c.endswith('_ms2') for c in columns) else ''
+    result = pd.DataFrame(jerk, columns=[f'j{ax}{unit}' for ax in 'xyz'], index=df.index)
+    result[f'jerk_mag{unit}'] = np.sqrt((jerk ** 2).sum(axis=1))
+    return result
+
+
+def detect_onsets(x: np.ndarray, fs: float, threshold: float = 6.0,
+                  refractory_s: float = 0.5) -> np.ndarray:
+    """
+    Onsets of transients in a non-negative detection signal (e.g. |jerk|).
+
+    A sample is active when x exceeds median + threshold × robust sigma
+    (1.4826 × MAD). An onset is an inactive-to-active transition preceded
+    by at least refractory_s without any other transition, so ringing
+    after a transient does not re-trigger.
+
+    Parameters:
+        x: Detection signal, shape (N,)
+        fs: Sample rate in Hz
+        threshold: Threshold in robust standard deviations
+        refractory_s: Minimum quiet time before an onset
+
+    Returns:
+        Sample indices of onsets
+    """
+    x = np.asarray(x, dtype=np.float64)
+    median = np.nanmedian(x)
+    sigma = 1.4826 * np.nanmedian(np.abs(x - median))
+    active = x > median + threshold * sigma
+
+    rising = np.flatnonzero(active[1:] & ~active[:-1]) + 1
+    falling = np.flatnonzero(active[:-1] & ~active[1:]) + 1
+    if active[0]:
+        rising = np.concatenate([[0], rising])
+    if len(rising) == 0:
+        return rising
+
+    # Transitions alternate, so the one before rising[k] is falling[k - 1]
+    quiet = np.empty(len(rising))
+    quiet[0] = np.inf
+    quiet[1:] = rising[1:] - falling[:len(rising) - 1]
+    return rising[quiet >= refractory_s * fs]
+
+
+def epoch_windows(values: np.ndarray, pre: int, post: int) -> np.ndarray:
+    """
+    Zero-copy view of every window of pre + post samples.
+
+    Window s covers samples s .. s + pre + post - 1, so the epoch of an
+    onset at sample i is window i - pre.
+
+    Parameters:
+        values: Data, shape (N, channels)
+        pre, post: Samples before and after the onset
+
+    Returns:
+        Read-only view of shape (N - pre - post + 1, channels, pre + post)
+    """
+    return np.lib.stride_tricks.sliding_window_view(values, pre + post, axis=0)
+
+
+def _valid_onsets(onsets: np.ndarray, n: int, pre: int, post: int) -> np.ndarray:
+    """Onsets whose whole epoch lies inside the record."""
+    onsets = np.asarray(onsets, dtype=np.int64)
+    return onsets[(onsets - pre >= 0) & (onsets + post <= n)]
+
+
+def extract_epochs(values: np.ndarray, onsets: np.ndarray, pre: int, post: int,
+                   baseline: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Epochs around onsets as one (events, channels, samples) array.
+
+    This gathers the epochs into a new array; average_epochs() computes
+    averages without doing so.
+
+    Parameters:
+        values: Data, shape (N, channels)
+        onsets: Onset sample indices
+        pre, post: Samples before and after each onset
+        baseline: Subtract each epoch's pre-onset mean
+
+    Returns:
+        Tuple of (epochs, onsets used); onsets too close to either end
+        of the record are dropped
+    """
+    onsets = _valid_onsets(onsets, len(values), pre, post)
+    epochs = epoch_windows(values, pre, post)[onsets - pre]
+    if baseline and pre > 0:
+        epochs = epochs - epochs[:, :, :pre].mean(axis=2, keepdims=True)
+    return epochs, onsets
+
+
+def average_epochs(values: np.ndarray, onsets: np.ndarray, pre: int, post: int,
+                   baseline: bool = True, confidence: float = 0.95) -> dict:
+    """
+    Event-averaged response with confidence bands.
+
+    Loops over the pre + post window offsets, each step reading one
+    sample per event and channel, so memory is O(events × channels)
+    whatever the window length.
+
+    Parameters:
+        values: Data, shape (N, channels)
+        onsets: Onset sample indices
+        pre, post: Samples before and after each onset
+        baseline: Subtract each epoch's pre-onset mean
+        confidence: Confidence level of the t-based band on the mean
+
+    Returns:
+        Dict with 'onsets' used, 'n_events', and 'mean', 'std',
+        'ci_low', 'ci_high' of shape (channels, pre + post)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    onsets = _valid_onsets(onsets, len(values), pre, post)
+    n_events = len(onsets)
+    n_ch = values.shape[1]
+    width = pre + post
+
+    offset = np.zeros((n_events, n_ch))
+    if baseline and pre > 0:
+        for k in range(pre):
+            offset += values[onsets - pre + k]
+        offset /= pre
+
+    mean = np.empty((n_ch, width))
+    std = np.empty((n_ch, width))
+    for k in range(width):
+        sample = values[onsets - pre + k] - offset
+        mean[:, k] = sample.mean(axis=0) if n_events else np.nan
+        std[:, k] = sample.std(axis=0, ddof=1) if n_events > 1 else np.nan
+
+    if n_events > 1:
+        half = stats.t.ppf((1 + confidence) / 2, n_events - 1) * std / np.sqrt(n_events)
+    else:
+        half = np.full_like(mean, np.nan)
+
+    return {
+        'onsets': onsets,
+        'n_events': n_events,
+        'mean': mean,
+        'std': std,
+        'ci_low': mean - half,
+        'ci_high': mean + half,
+    }
+
+
+def event_average(df: pd.DataFrame,
+                  pre_s: float = 0.5,
+                  post_s: float = 2.0,
+                  columns: Optional[Sequence[str]] = None,
+                  fs: Optional[float] = None,
+                  threshold: float = 6.0,
+                  refractory_s: Optional[float] = None,
+                  onsets: Optional[np.ndarray] = None,
+                  baseline: bool = True,
+                  confidence: float = 0.95) -> dict:
+    """
+    Jerk-triggered average of the magnetometer response.
+
+    Parameters:
+        df: DataFrame with accelerometer and magnetometer data
+        pre_s, post_s: Epoch window around each onset in seconds
+        columns: Response channels (default: magnetometer axes,
+                 calibrated if present)
+        fs: Sample rate in Hz (default: measured from time_s)
+        threshold: Jerk threshold in robust standard deviations
+        refractory_s: Quiet time before an onset (default: post_s)
+        onsets: Onset sample indices to use instead of jerk detection
+        baseline: Subtract each epoch's pre-onset mean
+        confidence: Confidence level of the bands
+
+    Returns:
+        Dict from average_epochs() plus 'columns', 'fs' and 'time_s'
+        (offset of each epoch sample from the onset)
+    """
+    fs = sample_rate(df, fs)
+    if columns is None:
+        columns = _default_columns(df, '_uT', MAG_COLUMNS)
+    columns = list(columns)
+    pre, post = int(round(pre_s * fs)), int(round(post_s * fs))
+
+    if onsets is None:
+        jerk = compute_jerk(df, fs).iloc[:, -1].to_numpy()
+        onsets = detect_onsets(jerk, fs, threshold,
+                               post_s if refractory_s is None else refractory_s)
+
+    result = average_epochs(df[columns].to_numpy(dtype=np.float64), onsets,
+                            pre, post, baseline, confidence)
+    result['columns'] = columns
+    result['fs'] = fs
+    result['time_s'] = np.arange(-pre, post) / fs
+    return result
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+quality.py - Single-pass data quality engine
+
+QualityChecker evaluates every check on a 2-D (samples × channels) array
+in one vectorized pass and can be fed chunk by chunk, so quality checks
+on multi-GB runs stream at disk speed:
+
+    checker = QualityChecker(MAG_COLUMNS + ACCEL_COLUMNS)
+    for chunk in iter_experiment(filepath):
+        checker.update_frame(chunk)
+    report = checker.report()
+
+Timestamp checks: gaps, out-of-order and duplicate timestamps.
+Channel checks: NaNs, saturation, stuck-at values and isolated spikes.
+Problems are reported as [start, stop) sample index ranges.
+"""
+
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Union
+
+
+# HMC5883L saturates at ±2048
+SATURATION_LIMIT = 2047
+
+
+def _median_from_counts(values: np.ndarray, counts: np.ndarray) -> float:
+    """Median of a multiset given sorted unique values and their counts."""
+    n = counts.sum()
+    cum = np.cumsum(counts)
+    lo = values[np.searchsorted(cum, (n - 1) // 2 + 1)]
+    hi = values[np.searchsorted(cum, n // 2 + 1)]
+    return (lo + hi) / 2
+
+
+def _runs(mask: np.ndarray):
+    """
+    Runs of True in each column of a 2-D mask.
+
+    Returns:
+        (channel, start, stop) arrays, ordered by channel then start
+    """
+    d = np.diff(mask.astype(np.int8), axis=0,
+                prepend=np.zeros((1, mask.shape[1]), np.int8),
+                append=np.zeros((1, mask.shape[1]), np.int8))
+    channel, start = np.nonzero(d.T == 1)
+    _, stop = np.nonzero(d.T == -1)
+    return channel, start, stop
+
+
+class _RunTracker:
+    """
+    Collect flagged sample ranges per channel across chunks.
+
+    Runs touching a chunk boundary are merged with the next chunk. Only
+    runs of at least min_length samples are kept, and at most max_ranges
+    ranges are stored per channel (counts stay exact).
+    """
+
+    def __init__(self, n_channels: int, min_length: int = 1, lead: int = 0,
+                 max_ranges: int = 1000):
+        self.min_length = min_length
+        self.lead = lead
+        self.max_ranges = max_ranges
+        self.open_start = np.full(n_channels, -1, dtype=np.int64)
+        self.samples = np.zeros(n_channels, dtype=np.int64)
+        self.count = np.zeros(n_channels, dtype=np.int64)
+        self.ranges: List[list] = [[] for _ in range(n_channels)]
+
+    def update(self, mask: np.ndarray, offset: int):
+        n = len(mask)
+        channel, start, stop = _runs(mask)
+        start = start + offset
+        stop = stop + offset
+
+        # Continue runs left open at the end of the previous chunk
+        prev_open = self.open_start.copy()
+        cont = (start == offset) & (prev_open[channel] >= 0)
+        start[cont] = prev_open[channel[cont]]
+        continued = np.zeros(len(prev_open), dtype=bool)
+        continued[channel[cont]] = True
+        ended = np.flatnonzero((prev_open >= 0) & ~continued)
+
+        still_open = stop == offset + n
+        self.open_start[:] = -1
+        self.open_start[channel[still_open]] = start[still_open]
+
+        done = ~still_open
+        self._close(np.concatenate([ended, channel[done]]),
+                    np.concatenate([prev_open[ended], start[done]]),
+                    np.concatenate([np.full(len(ended), offset), stop[done]]))
+
+    def finish(self, end: int):
+        channels = np.flatnonzero(self.open_start >= 0)
+        self._close(channels, self.open_start[channels], np.full(len(channels), end))
+        self.open_start[:] = -1
+
+    def _close(self, channel: np.ndarray, start: np.ndarray, stop: np.ndarray):
+        start = np.maximum(start - self.lead, 0)
+        keep = stop - start >= self.min_length
+        channel, start, stop = channel[keep], start[keep], stop[keep]
+        if len(channel) == 0:
+            return
+
+        n_channels = len(self.count)
+        self.count += np.bincount(channel, minlength=n_channels)
+        self.samples += np.bincount(channel, weights=stop - start,
+                                    minlength=n_channels).astype(np.int64)
+
+        order = np.lexsort((start, channel))
+        channel, start, stop = channel[order], start[order], stop[order]
+        for c in np.unique(channel):
+            room = self.max_ranges - len(self.ranges[c])
+            if room <= 0:
+                continue
+            sel = np.flatnonzero(channel == c)[:room]
+            self.ranges[c].extend(zip(start[sel].tolist(), stop[sel].tolist()))
+
+
+class QualityChecker:
+    """
+    Incremental, vectorized data quality checks.
+
+    Parameters:
+        channels: Channel names, in the column order of the data array
+        saturation_limit: |value| at or above which a sample is saturated
+        stuck_samples: Minimum run of identical values flagged as stuck
+        spike_threshold: Spike threshold in robust (MAD) standard
+                         deviations of the sample-to-sample difference
+        spike_scale_samples: Samples at the start of the run used to
+                             estimate that standard deviation
+        gap_factor: Interval, in median intervals, counted as a gap
+        max_ranges: Maximum ranges stored per check and channel
+    """
+
+    def __init__(self, channels: List[str],
+                 saturation_limit: float = SATURATION_LIMIT,
+                 stuck_samples: int = 50,
+                 spike_threshold: float = 8.0,
+                 spike_scale_samples: int = 4096,
+                 gap_factor: float = 2.0,
+                 max_ranges: int = 1000):
+        self.channels = list(channels)
+        self.saturation_limit = saturation_limit
+        self.stuck_samples = stuck_samples
+        self.spike_threshold = spike_threshold
+        self.spike_scale_samples = spike_scale_samples
+        self.gap_factor = gap_factor
+        self.max_ranges = max_ranges
+
+        n = len(self.channels)
+        self.nan = _RunTracker(n, max_ranges=max_ranges)
+        self.saturated = _RunTracker(n, max_ranges=max_ranges)
+        self.stuck = _RunTracker(n, min_length=stuck_samples, lead=1, max_ranges=max_ranges)
+        self.spikes = _RunTracker(n, max_ranges=max_ranges)
+        self.out_of_order = _RunTracker(1, max_ranges=max_ranges)
+        self.duplicates = _RunTracker(1, max_ranges=max_ranges)
+
+        # Timestamp intervals are kept as a histogram so the median is exact
+        self._dt_values = np.array([])
+        self._dt_counts = np.array([])
+        self._gap_candidates = []
+
+        self.sample_count = 0
+        self._first_ts = None
+        self._last_ts = None
+        self._tail = np.empty((0, n))
+
+        # Spike limits are fixed from the start of the run so results do
+        # not depend on chunk size; samples wait here until they are known
+        self._spike_limit = None
+        self._spike_pending = []
+        self._spike_tail = np.empty((0, n))
+        self._spike_offset = 0
+
+    def update(self, timestamps: np.ndarray, data: np.ndarray):
+        """
+        Check the next chunk of samples.
+
+        Parameters:
+            timestamps: Sample timestamps in microseconds, shape (N,)
+            data: Channel values, shape (N, len(channels))
+        """
+        n = len(timestamps)
+        if n == 0:
+            return
+        data = np.asarray(data, dtype=np.float64)
+        offset = self.sample_count
+
+        self._check_timestamps(np.asarray(timestamps), offset)
+
+        self.nan.update(np.isnan(data), offset)
+        self.saturated.update(np.abs(data) >= self.saturation_limit, offset)
+
+        # Compare with the last sample of the previous chunk so stuck
+        # runs continue across the boundary
+        ext = np.concatenate([self._tail, data])
+        same = ext[1:] == ext[:-1]
+        if len(self._tail) == 0:
+            same = np.concatenate([np.zeros((1, data.shape[1]), bool), same])
+        self.stuck.update(same, offset)
+        self._tail = ext[-1:]
+
+        if self._spike_limit is None:
+            self._spike_pending.append(data)
+            if sum(len(d) for d in self._spike_pending) >= self.spike_scale_samples:
+                self._flush_spikes()
+        else:
+            self._check_spikes(data)
+
+        self.sample_count += n
+
+    def _check_timestamps(self, ts: np.ndarray, offset: int):
+        if self._first_ts is None:
+            self._first_ts = ts[0]
+            dt = np.diff(ts).astype(np.float64)
+            dt_offset = offset + 1
+        else:
+            dt = np.diff(ts, prepend=self._last_ts).astype(np.float64)
+            dt_offset = offset
+        self._last_ts = ts[-1]
+        if len(dt) == 0:
+            return
+
+        values, counts = np.unique(dt, return_counts=True)
+        values = np.concatenate([self._dt_values, values])
+        counts = np.concatenate([self._dt_counts, counts])
+        self._dt_values, inverse = np.unique(values, return_inverse=True)
+        self._dt_counts = np.bincount(inverse, weights=counts)
+
+        self.out_of_order.update((dt < 0)[:, None], dt_offset)
+        self.duplicates.update((dt == 0)[:, None], dt_offset)
+
+        # The final median is only known at the end, so keep anything that
+        # could still turn out to be a gap
+        if np.any(self._dt_values > 0):
+            positive = self._dt_values > 0
+            median = _median_from_counts(self._dt_values[positive], self._dt_counts[positive])
+            idx = np.flatnonzero(dt > self.gap_factor * median / 2)
+            if len(self._gap_candidates) < 10 * self.max_ranges:
+                self._gap_candidates.extend(zip((idx + dt_offset).tolist(), dt[idx].tolist()))
+
+    def _flush_spikes(self):
+        """Fix the spike limits from the pending samples, then check them."""
+        pending = np.concatenate(self._spike_pending)
+        self._spike_pending = []
+
+        d = np.diff(pending, axis=0)
+        with np.errstate(invalid='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            scale = 1.4826 * np.nanmedian(np.abs(d - np.nanmedian(d, axis=0)), axis=0)
+            # Heavily quantised channels can have a MAD of zero
+            scale = np.where(scale > 0, scale, np.nanmean(np.abs(d), axis=0))
+        self._spike_limit = np.where(scale > 0, self.spike_threshold * scale, np.inf)
+
+        self._check_spikes(pending)
+
+    def _check_spikes(self, data: np.ndarray):
+        """Flag isolated samples that jump away from and back to both neighbours."""
+        # Keep the last two samples: the final one can only be judged
+        # once the next chunk arrives
+        ext = np.concatenate([self._spike_tail, data])
+        self._spike_tail = ext[-2:]
+        if len(ext) < 3:
+            return
+
+        d = np.diff(ext, axis=0)
+        before, after = d[:-1], d[1:]
+        with np.errstate(invalid='ignore'):
+            spike = ((np.abs(before) > self._spike_limit)
+                     & (np.abs(after) > self._spike_limit)
+                     & (np.sign(before) != np.sign(after)))
+
+        # spike[i] refers to ext[i + 1]
+        self.spikes.update(spike, self._spike_offset + 1)
+        self._spike_offset += len(spike)
+
+    def update_frame(self, df: pd.DataFrame):
+        """Check a DataFrame chunk; missing channels are treated as NaN."""
+        data = df.reindex(columns=self.channels).to_numpy(dtype=np.float64)
+        self.update(df['timestamp_us'].to_numpy(), data)
+
+    def report(self) -> dict:
+        """
+        Summarise all checks so far.
+
+        Returns:
+            Dict with run-level entries (sample_count, duration_s,
+            sample_rate_hz, timestamp_gaps, gap_ranges, out_of_order,
+            out_of_order_ranges, duplicate_timestamps, duplicate_ranges)
+            and 'channels', mapping each channel to counts and ranges
+            for nan, saturated, stuck and spikes
+        """
+        if self._spike_pending:
+            self._flush_spikes()
+
+        end = self.sample_count
+        for tracker in (self.nan, self.saturated, self.stuck, self.spikes,
+                        self.out_of_order, self.duplicates):
+            tracker.finish(end)
+
+        if self._dt_counts.sum() > 0:
+            expected_dt = _median_from_counts(self._dt_values, self._dt_counts)
+            gaps = int(self._dt_counts[self._dt_values > self.gap_factor * expected_dt].sum())
+        else:
+            expected_dt = np.nan
+            gaps = 0
+        gap_ranges = [(i - 1, i + 1) for i, dt in self._gap_candidates
+                      if dt > self.gap_factor * expected_dt][:self.max_ranges]
+
+        duration = ((self._last_ts - self._first_ts) / 1e6
+                    if self._first_ts is not None else np.nan)
+
+        channels = {}
+        for c, name in enumerate(self.channels):
+            channels[name] = {
+                'nan': int(self.nan.samples[c]),
+                'nan_ranges': self.nan.ranges[c],
+                'saturated': int(self.saturated.samples[c]),
+                'saturated_ranges': self.saturated.ranges[c],
+                'stuck': int(self.stuck.samples[c]),
+                'stuck_ranges': self.stuck.ranges[c],
+                'spikes': int(self.spikes.samples[c]),
+                'spike_ranges': self.spikes.ranges[c],
+            }
+
+        return {
+            'sample_count': self.sample_count,
+            'duration_s': float(duration),
+            'sample_rate_hz': 1e6 / expected_dt,
+            'timestamp_gaps': gaps,
+            'gap_ranges': gap_ranges,
+            'out_of_order': int(self.out_of_order.samples[0]),
+            'out_of_order_ranges': self.out_of_order.ranges[0],
+            'duplicate_timestamps': int(self.duplicates.samples[0]),
+            'duplicate_ranges': self.duplicates.ranges[0],
+            'channels': channels,
+        }
+
+
+def check_quality(data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                  channels: Optional[List[str]] = None, **kwargs) -> dict:
+    """
+    Run all quality checks over a DataFrame or a stream of chunks.
+
+    Parameters:
+        data: DataFrame with 'timestamp_us', or iterable of chunks
+              (e.g. from data_loader.iter_experiment())
+        channels: Channels to check (default: all raw sensor columns
+                  present in the first chunk)
+        **kwargs: Passed to QualityChecker
+
+    Returns:
+        Dict from QualityChecker.report()
+    """
+    from .data_loader import MAG_COLUMNS, ACCEL_COLUMNS
+
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    checker = None
+    for chunk in chunks:
+        if checker is None:
+            if channels is None:
+                channels = [c for c in MAG_COLUMNS + ACCEL_COLUMNS if c in chunk.columns]
+            checker = QualityChecker(channels, **kwargs)
+        checker.update_frame(chunk)
+
+    if checker is None:
+        checker = QualityChecker(channels or [], **kwargs)
+    return checker.report()
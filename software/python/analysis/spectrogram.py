@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+spectrogram.py - Multi-resolution spectrogram store for long runs
+
+An overnight run's full spectrogram does not fit in memory, let alone on
+a plot. build_spectrogram_pyramid() streams the data once and writes
+float32 tiles at several time/frequency resolutions:
+
+    store/manifest.json
+    store/level_0/freqs.npy, tile_00000.npy, ...
+    store/level_1/...
+
+Each level is (nperseg, n_avg): segments of nperseg samples with 50%
+overlap, n_avg consecutive periodograms averaged into one frame. Level 0
+defaults to the segments of compute_spectrogram(). SpectrogramPyramid
+then reads only the tiles covering the requested span, at the finest
+level that fits the requested number of frames:
+
+    build_spectrogram_pyramid(iter_experiment(path), 'run.spec', fs=100)
+    f, t, Sxx = SpectrogramPyramid('run.spec').read(t_range=(0, 3600))
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple, Union
+
+from .data_loader import MAG_COLUMNS
+from .signal_processing import PeriodogramStream, sample_rate
+
+
+PYRAMID_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+# (nperseg, n_avg) per level, finest first
+DEFAULT_LEVELS = ((256, 1), (256, 16), (1024, 64))
+DEFAULT_TILE_FRAMES = 1024
+
+
+class _LevelWriter:
+    """Averages periodograms into frames and writes them out in tiles."""
+
+    def __init__(self, directory: Path, fs: float, nperseg: int, n_avg: int,
+                 window, tile_frames: int):
+        self.directory = directory
+        self.directory.mkdir()
+        self.stream = PeriodogramStream(fs, nperseg, window=window)
+        self.n_avg = n_avg
+        self.tile_frames = tile_frames
+        self._pending = []   # Periodograms not yet averaged into a frame
+        self._frames = []    # Frames not yet written
+        self.n_frames = 0
+        self.last_avg = n_avg  # Periodograms in the last frame
+        self.tiles = []
+        np.save(directory / 'freqs.npy', self.stream.freqs)
+
+    def push(self, data: np.ndarray):
+        spec = self.stream.push(data)
+        if spec.shape[1]:
+            self._pending.append(spec)
+        pending = sum(p.shape[1] for p in self._pending)
+        if pending >= self.n_avg:
+            spec = np.concatenate(self._pending, axis=1)
+            n = pending // self.n_avg * self.n_avg
+            c, _, f = spec.shape
+            self._frames.append(spec[:, :n].reshape(c, -1, self.n_avg, f).mean(axis=2))
+            self._pending = [spec[:, n:]] if n < pending else []
+        self._write(final=False)
+
+    def close(self):
+        pending = [p for p in self._pending if p.shape[1]]
+        if pending:
+            # A shorter last frame beats losing the end of the run
+            spec = np.concatenate(pending, axis=1)
+            self.last_avg = spec.shape[1]
+            self._frames.append(spec.mean(axis=1, keepdims=True))
+            self._pending = []
+        self._write(final=True)
+
+    def _write(self, final: bool):
+        frames = sum(f.shape[1] for f in self._frames)
+        if frames < self.tile_frames and not (final and frames):
+            return
+        spec = np.concatenate(self._frames, axis=1)
+        start = 0
+        while spec.shape[1] - start >= self.tile_frames or (final and start < spec.shape[1]):
+            tile = spec[:, start:start + self.tile_frames].astype(np.float32)
+            name = f'tile_{len(self.tiles):05d}.npy'
+            np.save(self.directory / name, tile)
+            self.tiles.append(name)
+            self.n_frames += tile.shape[1]
+            start += tile.shape[1]
+        self._frames = [spec[:, start:]] if start < spec.shape[1] else []
+
+    def manifest(self) -> dict:
+        stream = self.stream
+        # The last frame may average fewer segments, so its centre is
+        # stored rather than extrapolated from the frame step
+        last_segment = (self.n_frames - 1) * self.n_avg + (self.last_avg - 1) / 2
+        return {
+            'nperseg': stream.nperseg,
+            'noverlap': stream.noverlap,
+            'n_avg': self.n_avg,
+            # Frame k covers segments k*n_avg .. (k+1)*n_avg - 1
+            'frame_step_s': stream.step * self.n_avg / stream.fs,
+            'first_frame_s': (stream.nperseg / 2 + stream.step * (self.n_avg - 1) / 2) / stream.fs,
+            'last_frame_s': (stream.nperseg / 2 + stream.step * last_segment) / stream.fs,
+            'n_frames': self.n_frames,
+            'tile_frames': self.tile_frames,
+            'tiles': self.tiles,
+        }
+
+
+def build_spectrogram_pyramid(data: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                              path: str,
+                              columns: Optional[Sequence[str]] = None,
+                              fs: Optional[float] = None,
+                              levels: Sequence[Tuple[int, int]] = DEFAULT_LEVELS,
+                              window=('tukey', 0.25),
+                              tile_frames: int = DEFAULT_TILE_FRAMES) -> Path:
+    """
+    Build an on-disk spectrogram pyramid in one pass over the data.
+
+    Parameters:
+        data: DataFrame with 'time_s', or iterable of DataFrame chunks
+              (e.g. from data_loader.iter_experiment())
+        path: Output directory (replaced if it exists)
+        columns: Channels (default: magnetometer axes, calibrated if present)
+        fs: Sample rate in Hz (default: measured from the first chunk)
+        levels: (nperseg, n_avg) for each level, finest first
+        window: Window for every level (default matches compute_spectrogram)
+        tile_frames: Frames per tile file
+
+    Returns:
+        Path of the store
+    """
+    chunks = [data] if isinstance(data, pd.DataFrame) else data
+    path = Path(path)
+    tmp = Path(tempfile.mkdtemp(prefix=f'.{path.name}.', dir=path.parent))
+
+    try:
+        writers = None
+        t0 = None
+        for chunk in chunks:
+            if len(chunk) == 0:
+                continue
+            if writers is None:
+                if columns is None:
+                    calibrated = [f'{col}_uT' for col in MAG_COLUMNS]
+                    columns = calibrated if all(c in chunk.columns for c in calibrated) else \
+                        [col for col in MAG_COLUMNS if col in chunk.columns]
+                columns = list(columns)
+                fs = sample_rate(chunk, fs)
+                t0 = float(chunk['time_s'].iloc[0])
+                writers = [_LevelWriter(tmp / f'level_{i}', fs, nperseg, n_avg, window, tile_frames)
+                           for i, (nperseg, n_avg) in enumerate(levels)]
+            x = chunk[columns].to_numpy(dtype=np.float64).T
+            for writer in writers:
+                writer.push(x)
+
+        if writers is None:
+            raise ValueError("No data")
+        for writer in writers:
+            writer.close()
+
+        manifest = {
+            'version': PYRAMID_VERSION,
+            'fs': fs,
+            't0': t0,
+            'columns': columns,
+            'window': list(window) if isinstance(window, tuple) else window,
+            'levels': [writer.manifest() for writer in writers],
+        }
+        with open(tmp / MANIFEST_NAME, 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    return path
+
+
+class SpectrogramPyramid:
+    """Reader for stores written by build_spectrogram_pyramid()."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path / MANIFEST_NAME, 'r') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != PYRAMID_VERSION:
+            raise ValueError(f"Unsupported spectrogram store version in {path}")
+        self.columns = self.manifest['columns']
+        self.levels = self.manifest['levels']
+        self.t0 = self.manifest['t0']
+
+    def frame_times(self, level: int) -> np.ndarray:
+        """Centre time of every frame of a level, in the run's time_s."""
+        lv = self.levels[level]
+        times = self.t0 + lv['first_frame_s'] + np.arange(lv['n_frames']) * lv['frame_step_s']
+        if lv['n_frames']:
+            times[-1] = self.t0 + lv['last_frame_s']
+        return times
+
+    def choose_level(self, t_range: Optional[Tuple[float, float]] = None,
+                     max_frames: int = 2000) -> int:
+        """Finest level with at most max_frames frames in t_range."""
+        for i, lv in enumerate(self.levels):
+            if t_range is None:
+                frames = lv['n_frames']
+            else:
+                frames = (t_range[1] - t_range[0]) / lv['frame_step_s']
+            if frames <= max_frames:
+                return i
+        return len(self.levels) - 1
+
+    def read(self, t_range: Optional[Tuple[float, float]] = None,
+             level: Optional[int] = None,
+             max_frames: int = 2000,
+             columns: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Read a time span of the spectrogram, loading only the tiles it touches.
+
+        Parameters:
+            t_range: (start, end) in seconds of time_s (default: whole run)
+            level: Level to read (default: choose_level(t_range, max_frames))
+            max_frames: Frame budget for automatic level choice
+            columns: Channels to return (default: all)
+
+        Returns:
+            Tuple of (frequencies, times, Sxx of shape
+            (channels, frequencies, times)), float32
+        """
+        if level is None:
+            level = self.choose_level(t_range, max_frames)
+        lv = self.levels[level]
+        directory = self.path / f'level_{level}'
+        freqs = np.load(directory / 'freqs.npy')
+
+        times = self.frame_times(level)
+        i0, i1 = 0, len(times)
+        if t_range is not None:
+            i0, i1 = np.searchsorted(times, t_range[0]), np.searchsorted(times, t_range[1])
+
+        idx = slice(None) if columns is None else [self.columns.index(c) for c in columns]
+        n_ch = len(self.columns) if columns is None else len(columns)
+        out = np.empty((n_ch, i1 - i0, len(freqs)), dtype=np.float32)
+
+        size = lv['tile_frames']
+        for k in range(i0 // size, -(-i1 // size) if i1 > i0 else i0 // size):
+            tile = np.load(directory / lv['tiles'][k], mmap_mode='r')
+            lo, hi = max(i0, k * size), min(i1, (k + 1) * size)
+            out[:, lo - i0:hi - i0] = tile[idx, lo - k * size:hi - k * size]
+
+        return freqs, times[i0:i1], out.transpose(0, 2, 1)
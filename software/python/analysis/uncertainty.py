@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+uncertainty.py - Monte Carlo propagation of calibration uncertainty
+
+calculate_upper_bound() and test_pais_scaling() treat the calibration
+constants as exact. Here the constants are drawn from their
+uncertainties (the *_std fields of MagnetometerCalibration and
+AccelerometerCalibration) and every draw is pushed through calibration,
+baseline and detection statistics:
+
+    result = propagate_detection(df, signal_mask, baseline_mask, n_draws=2000)
+    summarize(result['upper_bound'])
+
+Draws are processed as stacked arrays, a batch of draws against a block
+of samples at a time, never as per-draw DataFrames. Batches can be
+spread over worker processes; all draws are made up front from one
+seed, so results do not depend on the number of workers.
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import stats
+from typing import Optional, Sequence, Tuple
+
+from .calibration import (AccelerometerCalibration, DEFAULT_ACCEL_CAL, DEFAULT_MAG_CAL,
+                          MAG_SENSORS, calibration_arrays)
+
+
+def sample_mag_calibrations(calibrations: dict, sensors: Sequence[str], n_draws: int,
+                            rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Draw magnetometer calibrations from their uncertainties.
+
+    Offsets, per-axis scales and sensitivities are drawn independently
+    from normal distributions; a soft iron matrix is kept fixed.
+
+    Parameters:
+        calibrations: Dict mapping sensor names to MagnetometerCalibration
+        sensors: Sensor order of the stacked arrays
+        n_draws: Number of draws
+        rng: Random generator
+
+    Returns:
+        Tuple of (offsets (D, S, 3) in LSB, matrices (D, S, 3, 3) from
+        LSB to μT), as used by calibrate_array()
+    """
+    offsets, matrices = calibration_arrays(calibrations, sensors, units='lsb')
+    n_s = len(sensors)
+    offset_std = np.array([calibrations[s].offset_std for s in sensors])
+    scale = np.array([[getattr(calibrations[s], f'scale_{ax}') for ax in 'xyz'] for s in sensors])
+    scale_std = np.array([calibrations[s].scale_std for s in sensors])
+    sens = np.array([calibrations[s].sensitivity for s in sensors])
+    sens_std = np.array([calibrations[s].sensitivity_std for s in sensors])
+
+    offsets = offsets + offset_std[:, None] * rng.standard_normal((n_draws, n_s, 3))
+    # A scale draw rescales the matching column of soft_iron @ diag(scale)
+    gain = 1 + scale_std[:, None] * rng.standard_normal((n_draws, n_s, 3)) / scale
+    sens = sens + sens_std * rng.standard_normal((n_draws, n_s))
+    # 1 Gauss = 100 μT, sensitivity is in LSB/Gauss
+    matrices = matrices * gain[:, :, None, :] / (sens / 100)[:, :, None, None]
+    return offsets, matrices
+
+
+def sample_accel_calibration(cal: AccelerometerCalibration, n_draws: int,
+                             rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Draw accelerometer calibrations from their uncertainties.
+
+    Returns:
+        Tuple of (offsets (D, 3) in LSB, sensitivities (D,) in mg/LSB)
+    """
+    offsets = np.array([cal.offset_x, cal.offset_y, cal.offset_z])
+    offsets = offsets + cal.offset_std * rng.standard_normal((n_draws, 3))
+    sens = cal.sensitivity + cal.sensitivity_std * rng.standard_normal(n_draws)
+    return offsets, sens
+
+
+# Raw window data shared with worker processes by _init_worker()
+_shared = None
+
+
+def _init_worker(data):
+    global _shared
+    _shared = data
+
+
+def _quadratic_features(raw: np.ndarray) -> np.ndarray:
+    """Monomials of (N, S, 3) samples such that |M(r - o)|² is linear in them."""
+    x, y, z = raw[..., 0], raw[..., 1], raw[..., 2]
+    return np.stack([x * x, y * y, z * z, 2 * x * y, 2 * x * z, 2 * y * z,
+                     x, y, z, np.ones_like(x)], axis=-1)
+
+
+def _window_moments(offsets: np.ndarray, matrices: np.ndarray, raw: np.ndarray,
+                    block_elements: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and variance of calibrated x, y, z and magnitude over a window.
+
+    Calibration is affine, so the axis moments follow exactly from the
+    raw window mean and covariance. The squared magnitude is a quadratic
+    form in the raw sample, i.e. linear in _quadratic_features(), so
+    the magnitudes of a block of samples for all draws are one matrix
+    product per sensor; only the square root is per draw and sample.
+
+    Parameters:
+        offsets, matrices: Calibrations, shapes (D, S, 3) and (D, S, 3, 3)
+        raw: Raw window samples, shape (N, S, 3)
+        block_elements: Magnitudes computed at a time
+
+    Returns:
+        Tuple of (mean, var), shape (D, S, 4)
+    """
+    n_draws, n_s = offsets.shape[:2]
+    mu = raw.mean(axis=0)
+    dev = raw - mu
+    cov = np.einsum('nsj,nsk->sjk', dev, dev) / len(raw)
+
+    mean = np.empty((n_draws, n_s, 4))
+    var = np.empty((n_draws, n_s, 4))
+    mean[..., :3] = np.einsum('dsij,dsj->dsi', matrices, mu - offsets)
+    var[..., :3] = np.einsum('dsij,sjk,dsik->dsi', matrices, cov, matrices)
+
+    # |M(r - o)|² = rᵀAr - 2(Ao)ᵀr + oᵀAo with A = MᵀM
+    a = np.einsum('dsji,dsjk->dsik', matrices, matrices)
+    ao = np.einsum('dsij,dsj->dsi', a, offsets)
+    coef = np.concatenate([
+        a[..., [0, 1, 2, 0, 0, 1], [0, 1, 2, 1, 2, 2]],
+        -2 * ao,
+        np.einsum('dsi,dsi->ds', ao, offsets)[..., None],
+    ], axis=-1)                                              # (D, S, 10)
+
+    total = np.zeros((n_draws, n_s))
+    rows = max(1, block_elements // n_draws)
+    for i in range(0, len(raw), rows):
+        features = _quadratic_features(raw[i:i + rows])
+        for k in range(n_s):
+            squared = features[:, k] @ coef[:, k].T          # (rows, D)
+            total[:, k] += np.sqrt(np.maximum(squared, 0, out=squared), out=squared).sum(axis=0)
+    mean[..., 3] = total / len(raw)
+    # Mean of a quadratic form: its value at the mean plus tr(A cov)
+    mean_squared = np.einsum('dsf,sf->ds', coef, _quadratic_features(mu)) + \
+        np.einsum('dsjk,sjk->ds', a, cov)
+    var[..., 3] = np.maximum(mean_squared - mean[..., 3] ** 2, 0)
+    return mean, var
+
+
+def _detection_batch(offsets: np.ndarray, matrices: np.ndarray, data=None,
+                     block_elements: int = 1 << 20) -> tuple:
+    """Window moments of signal and baseline for one batch of draws."""
+    raw_signal, raw_baseline = data if data is not None else _shared
+    return (_window_moments(offsets, matrices, raw_signal, block_elements),
+            _window_moments(offsets, matrices, raw_baseline, block_elements))
+
+
+def propagate_detection(df: pd.DataFrame,
+                        signal_mask: np.ndarray,
+                        baseline_mask: np.ndarray,
+                        calibrations: Optional[dict] = None,
+                        accel_cal: Optional[AccelerometerCalibration] = None,
+                        n_draws: int = 1000,
+                        confidence: float = 0.95,
+                        seed: Optional[int] = None,
+                        max_workers: Optional[int] = 1,
+                        batch_draws: int = 100) -> dict:
+    """
+    Monte Carlo distribution of detection statistics and upper bounds.
+
+    For every calibration draw, the raw magnetometer readings in the
+    signal and baseline periods are calibrated, and the window means and
+    standard deviations of each axis and of the field magnitude give
+    the same quantities as detection_statistics() and
+    calculate_upper_bound() (with n_samples the signal period length).
+    The accelerometer standard deviation in the signal period, the
+    vibration amplitude, is drawn alongside.
+
+    A warning is issued when none of the calibrations has an
+    uncertainty, as with the defaults: all draws are then identical.
+
+    Parameters:
+        df: DataFrame with raw magnetometer (and accelerometer) columns
+        signal_mask: Boolean mask of stimulus samples
+        baseline_mask: Boolean mask of baseline samples
+        calibrations: Dict mapping sensor names to MagnetometerCalibration
+                      (default: DEFAULT_MAG_CAL)
+        accel_cal: AccelerometerCalibration (default: DEFAULT_ACCEL_CAL)
+        n_draws: Number of calibration draws
+        confidence: Confidence level of the upper bounds
+        seed: Seed for reproducible draws
+        max_workers: Worker processes (None = CPU count)
+        batch_draws: Draws per batch
+
+    Returns:
+        Dict with 'columns' (e.g. m1x_uT ... m1_mag_uT), 'nominal' (the
+        values for the nominal calibration), and arrays of shape
+        (draws, columns): 'baseline_mean', 'std_baseline', 'mean_diff',
+        'snr', 'upper_bound'; plus 'accel_std_ms2' of shape (draws, 3)
+        if the accelerometer columns are present
+    """
+    if calibrations is None:
+        calibrations = DEFAULT_MAG_CAL
+    if accel_cal is None:
+        accel_cal = DEFAULT_ACCEL_CAL
+    sensors = [s for s in MAG_SENSORS if s in calibrations
+               and all(f'{s}{ax}' in df.columns for ax in 'xyz')]
+    if not sensors:
+        raise ValueError("No magnetometer with all three axes")
+    signal_mask = np.asarray(signal_mask, dtype=bool)
+    baseline_mask = np.asarray(baseline_mask, dtype=bool)
+
+    raw = np.stack([df[[f'{s}{ax}' for ax in 'xyz']].to_numpy(dtype=np.float64)
+                    for s in sensors], axis=1)
+    data = (raw[signal_mask], raw[baseline_mask])
+    n_signal = len(data[0])
+    if n_signal == 0 or len(data[1]) == 0:
+        raise ValueError("Both periods need samples")
+
+    if all(calibrations[s].offset_std == 0 and calibrations[s].scale_std == 0
+           and calibrations[s].sensitivity_std == 0 for s in sensors):
+        warnings.warn("Calibrations have no uncertainties (all *_std are 0), so every "
+                      "draw equals the nominal calibration; fill them in, e.g. with "
+                      "calibrate_from_tumble()", stacklevel=2)
+
+    rng = np.random.default_rng(seed)
+    offsets, matrices = sample_mag_calibrations(calibrations, sensors, n_draws, rng)
+
+    starts = range(0, n_draws, batch_draws)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(starts))
+    batches = ([offsets[i:i + batch_draws] for i in starts],
+               [matrices[i:i + batch_draws] for i in starts])
+    if max_workers <= 1:
+        parts = [_detection_batch(o, m, data) for o, m in zip(*batches)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(data,)) as pool:
+            parts = list(pool.map(_detection_batch, *batches))
+
+    def detection(moments) -> dict:
+        (m_sig, _), (m_base, v_base) = moments
+        std_base = np.sqrt(v_base).reshape(len(m_sig), -1)
+        mean_diff = (m_sig - m_base).reshape(len(m_sig), -1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            snr = np.where(std_base > 0, mean_diff / std_base, 0.0)
+        return {
+            'baseline_mean': m_base.reshape(len(m_sig), -1),
+            'std_baseline': std_base,
+            'mean_diff': mean_diff,
+            'snr': snr,
+            # calculate_upper_bound() for every draw and column
+            'upper_bound': stats.norm.ppf(confidence) * std_base / np.sqrt(n_signal),
+        }
+
+    # Stack the batches: ((signal mean, var), (baseline mean, var))
+    result = detection(tuple(
+        tuple(np.concatenate([p[w][k] for p in parts]) for k in range(2))
+        for w in range(2)))
+    nominal_offsets, nominal_matrices = calibration_arrays(calibrations, sensors, units='uT')
+    nominal = detection(_detection_batch(nominal_offsets[None], nominal_matrices[None], data))
+    result['nominal'] = {k: v[0] for k, v in nominal.items()}
+    result['columns'] = [f'{s}{q}' for s in sensors
+                         for q in ('x_uT', 'y_uT', 'z_uT', '_mag_uT')]
+
+    accel = [f'a{ax}' for ax in 'xyz']
+    if all(col in df.columns for col in accel):
+        _, sens = sample_accel_calibration(accel_cal, n_draws, rng)
+        # Offsets cancel in a standard deviation; the sensitivity scales it
+        raw_std = df.loc[signal_mask, accel].to_numpy(dtype=np.float64).std(axis=0)
+        result['accel_std_ms2'] = sens[:, None] * 9.81 / 1000 * raw_std
+    return result
+
+
+def propagate_scaling(frequencies: np.ndarray,
+                      amplitudes: np.ndarray,
+                      amplitude_err: Optional[np.ndarray] = None,
+                      gain_std: float = 0.0,
+                      n_draws: int = 10000,
+                      seed: Optional[int] = None) -> dict:
+    """
+    Monte Carlo distribution of the fitted power-law exponent.
+
+    A calibration error common to all runs scales every amplitude alike
+    and leaves the exponent unchanged, so what matters is the scatter
+    between runs: each draw perturbs every amplitude by its own
+    statistical error and an independent relative gain error (e.g. a
+    sensor remounted between runs), then refits y = A·x^n by log-log
+    least squares as fit_power_law() does, for all draws at once.
+
+    Parameters:
+        frequencies: Test frequencies, shape (R,)
+        amplitudes: Measured amplitudes, shape (R,)
+        amplitude_err: 1σ amplitude errors, shape (R,) (default: none)
+        gain_std: Relative 1σ calibration gain error of each run
+        n_draws: Number of draws
+        seed: Seed for reproducible draws
+
+    Returns:
+        Dict with arrays of shape (draws,) 'exponent', 'coefficient',
+        'r_squared', and 'favors_pais', the fraction of draws whose
+        exponent is closer to 3 than to 2
+    """
+    x = np.asarray(frequencies, dtype=np.float64)
+    y = np.asarray(amplitudes, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    draws = y * (1 + gain_std * rng.standard_normal((n_draws, len(y))))
+    if amplitude_err is not None:
+        draws = draws + np.asarray(amplitude_err) * rng.standard_normal((n_draws, len(y)))
+
+    # Non-positive amplitudes drop out of the fit, as in fit_power_law()
+    valid = (x > 0) & (draws > 0)
+    log_x = np.where(valid, np.log(np.where(x > 0, x, 1)), 0.0)
+    log_y = np.where(valid, np.log(np.where(draws > 0, draws, 1)), 0.0)
+    n = valid.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mx = log_x.sum(axis=1) / n
+        my = log_y.sum(axis=1) / n
+        dx = np.where(valid, log_x - mx[:, None], 0.0)
+        dy = np.where(valid, log_y - my[:, None], 0.0)
+        sxx, syy, sxy = (dx * dx).sum(axis=1), (dy * dy).sum(axis=1), (dx * dy).sum(axis=1)
+        slope = sxy / sxx
+        r_squared = sxy ** 2 / (sxx * syy)
+    slope[n < 2] = np.nan
+
+    return {
+        'exponent': slope,
+        'coefficient': np.exp(my - slope * mx),
+        'r_squared': r_squared,
+        'favors_pais': float(np.mean(np.abs(slope - 3) < np.abs(slope - 2))),
+    }
+
+
+def summarize(samples: np.ndarray, levels: Sequence[float] = (0.025, 0.5, 0.975)) -> dict:
+    """
+    Summary of Monte Carlo draws along the first axis.
+
+    Returns:
+        Dict with 'mean', 'std' and 'quantiles' (levels × remaining shape)
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    return {
+        'mean': np.nanmean(samples, axis=0),
+        'std': np.nanstd(samples, axis=0, ddof=1),
+        'levels': list(levels),
+        'quantiles': np.nanquantile(samples, levels, axis=0),
+    }
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+cache_tool.py - Pre-warm and prune the experiment CSV cache
+
+The analysis loaders keep a binary columnar copy of each CSV next to it
+(see analysis/cache.py). This script builds those caches ahead of time
+and removes ones whose CSV has changed or been deleted.
+
+Usage:
+    python cache_tool.py warm <path> [<path> ...] [--pattern '*.csv']
+    python cache_tool.py prune <path> [<path> ...] [--dry-run]
+    python cache_tool.py clear <path> [<path> ...]
+
+Example:
+    python cache_tool.py warm data/raw/
+"""
+
+import sys
+
+from analysis.cache import main
+
+if __name__ == '__main__':
+    sys.exit(main())
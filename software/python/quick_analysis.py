@@ -18,6 +18,20 @@ from scipy import signal, stats
 from dataclasses import dataclass
 from typing import Tuple, Optional
 
+# Reuse the analysis package's CSV cache when it sits alongside this script
+try:
+    from analysis.cache import read_csv_cached as read_csv
+except ImportError:
+    read_csv = pd.read_csv
+
+# Share memoized PSDs with the analysis package when available
+try:
+    from analysis.signal_processing import compute_spectra
+except ImportError:
+    def compute_spectra(df, columns, fs, nperseg=None):
+        data = df[list(columns)].to_numpy(dtype=float).T
+        return signal.welch(data, fs, nperseg=nperseg, axis=-1)
+
 # ==================== DATA LOADING ====================
 
 @dataclass
@@ -44,7 +58,11 @@ def load_experiment(filepath: str) -> Tuple[pd.DataFrame, ExperimentMetadata]:
         filepath=str(path)
     )
     
-    df = pd.read_csv(filepath)
+    df = read_csv(filepath)
+    
+    # Undo 32-bit micros() wraparound (every ~71.6 min)
+    ts = df['timestamp_us'].to_numpy(dtype=np.int64)
+    df['timestamp_us'] = ts + np.cumsum(np.diff(ts, prepend=ts[0]) < -2**31) * 2**32
     
     # Add derived columns
     df['time_s'] = (df['timestamp_us'] - df['timestamp_us'].iloc[0]) / 1e6
@@ -209,11 +227,13 @@ def plot_experiment_overview(df: pd.DataFrame,
     
     # Panel 3: PSD
     ax3 = axes[1, 0]
-    for sensor in ['m1', 'm2', 'm3']:
-        col = f'{sensor}_mag_uT'
-        if col in df.columns:
-            f, psd = signal.welch(df[col].values, 100, nperseg=min(1024, len(df)//4))
-            ax3.semilogy(f, psd, label=sensor.upper(), alpha=0.7)
+    fs = 1.0 / np.median(np.diff(df['time_s']))
+    sensors = [s for s in ['m1', 'm2', 'm3'] if f'{s}_mag_uT' in df.columns]
+    if sensors:
+        f, psd = compute_spectra(df, [f'{s}_mag_uT' for s in sensors], fs=fs,
+                                 nperseg=min(1024, len(df)//4))
+        for sensor, p in zip(sensors, psd):
+            ax3.semilogy(f, p, label=sensor.upper(), alpha=0.7)
     ax3.set_xlabel('Frequency (Hz)')
     ax3.set_ylabel('PSD (μT²/Hz)')
     ax3.legend()
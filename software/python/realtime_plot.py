@@ -6,7 +6,7 @@ Displays live data stream from the DAQ system with rolling windows
 for time series and FFT spectrum.
 
 Usage:
-    python realtime_plot.py [--port /dev/ttyACM0] [--baud 115200]
+    python realtime_plot.py [--port /dev/ttyACM0] [--baud 115200] [--spectrum ema] [--notch 50]
 
 Requirements:
     pip install pyserial matplotlib numpy
@@ -31,6 +31,13 @@ except ImportError:
     print("Error: pyserial not installed. Run: pip install pyserial")
     sys.exit(1)
 
+# Averaged spectra and mains notching use the analysis package when it
+# sits alongside this script
+try:
+    from analysis.signal_processing import NotchFilter, WelchAccumulator
+except ImportError:
+    NotchFilter = WelchAccumulator = None
+
 
 # Configuration
 WINDOW_SECONDS = 10  # Rolling window size
@@ -41,18 +48,28 @@ BUFFER_SIZE = WINDOW_SECONDS * SAMPLE_RATE
 class DataBuffer:
     """Thread-safe circular buffer for sensor data."""
 
-    def __init__(self, maxlen: int):
+    def __init__(self, maxlen: int, notch=None):
         self.maxlen = maxlen
+        self.notch = notch  # Optional NotchFilter for the magnetometer magnitudes
         self.time = deque(maxlen=maxlen)
         self.m1_mag = deque(maxlen=maxlen)
         self.m2_mag = deque(maxlen=maxlen)
         self.m3_mag = deque(maxlen=maxlen)
         self.acc_mag = deque(maxlen=maxlen)
         self.start_time = None
+        self.last_timestamp = None
+        self.wrap_offset = 0
+        self.total = 0  # Samples added since start
 
     def add_sample(self, timestamp_us: int, m1x, m1y, m1z,
                    m2x, m2y, m2z, m3x, m3y, m3z, ax, ay, az):
         """Add a sample to the buffer."""
+        # micros() is 32-bit and wraps every ~71.6 min
+        if self.last_timestamp is not None and timestamp_us - self.last_timestamp < -2**31:
+            self.wrap_offset += 2**32
+        self.last_timestamp = timestamp_us
+        timestamp_us += self.wrap_offset
+
         if self.start_time is None:
             self.start_time = timestamp_us
 
@@ -64,11 +81,15 @@ class DataBuffer:
         m3_mag = np.sqrt(m3x**2 + m3y**2 + m3z**2)
         acc_mag = np.sqrt(ax**2 + ay**2 + az**2)
 
+        if self.notch is not None:
+            m1_mag, m2_mag, m3_mag = self.notch.filter(np.array([[m1_mag, m2_mag, m3_mag]]))[0]
+
         self.time.append(t)
         self.m1_mag.append(m1_mag)
         self.m2_mag.append(m2_mag)
         self.m3_mag.append(m3_mag)
         self.acc_mag.append(acc_mag)
+        self.total += 1
 
     def get_arrays(self):
         """Get numpy arrays of current buffer contents."""
@@ -151,8 +172,19 @@ def compute_fft(data: np.ndarray, fs: float = SAMPLE_RATE):
     return freqs, fft_mag
 
 
-def create_realtime_plot(buffer: DataBuffer, stop_event: Event):
-    """Create and run the real-time plot."""
+def create_realtime_plot(buffer: DataBuffer, stop_event: Event, spectrum: str = 'fft'):
+    """
+    Create and run the real-time plot.
+
+    spectrum selects the M1 spectrum panel: 'fft' of the current window,
+    or a Welch PSD over everything received, either averaged ('mean')
+    or exponentially weighted ('ema').
+    """
+    psd_acc = None
+    if spectrum != 'fft':
+        psd_acc = WelchAccumulator(SAMPLE_RATE, nperseg=256, alpha=0.1)
+    seen = [0]
+
     # Set up figure
     fig, axes = plt.subplots(2, 2, figsize=(12, 8))
     fig.suptitle('Pais Effect Demonstrator - Real-time Monitor', fontsize=14)
@@ -180,8 +212,13 @@ def create_realtime_plot(buffer: DataBuffer, stop_event: Event):
     ax3 = axes[1, 0]
     line_fft, = ax3.plot([], [], 'b-', alpha=0.8)
     ax3.set_xlabel('Frequency (Hz)')
-    ax3.set_ylabel('Magnitude')
-    ax3.set_title('FFT - Magnetometer 1')
+    if psd_acc is None:
+        ax3.set_ylabel('Magnitude')
+        ax3.set_title('FFT - Magnetometer 1')
+    else:
+        ax3.set_yscale('log')
+        ax3.set_ylabel('PSD (LSB²/Hz)')
+        ax3.set_title(f'Welch PSD ({spectrum}) - Magnetometer 1')
     ax3.set_xlim(0, SAMPLE_RATE / 2)
     ax3.grid(True, alpha=0.3)
 
@@ -219,8 +256,18 @@ def create_realtime_plot(buffer: DataBuffer, stop_event: Event):
             if len(acc) > 0:
                 ax2.set_ylim(acc.min() * 0.95, acc.max() * 1.05)
 
-        # Update FFT
-        if len(m1) >= 64:
+        # Update spectrum
+        if psd_acc is not None:
+            total = buffer.total
+            new = min(total - seen[0], len(m1))
+            seen[0] = total
+            if new > 0:
+                psd_acc.update(m1[len(m1) - new:])
+            if psd_acc.count > 0:
+                freqs, psd = psd_acc.ema() if spectrum == 'ema' else psd_acc.psd()
+                line_fft.set_data(freqs, psd[0])
+                ax3.set_ylim(max(psd[0][1:].min(), 1e-12) * 0.5, psd[0].max() * 2)
+        elif len(m1) >= 64:
             freqs, fft_mag = compute_fft(m1)
             if len(freqs) > 0:
                 line_fft.set_data(freqs, fft_mag)
@@ -266,9 +313,25 @@ def main():
                         help='Baud rate (default: 115200)')
     parser.add_argument('--demo', action='store_true',
                         help='Run in demo mode with simulated data')
+    parser.add_argument('--spectrum', choices=['fft', 'mean', 'ema'], default='fft',
+                        help='Spectrum panel: window FFT, or running/exponential '
+                             'Welch PSD average (default: fft)')
+    parser.add_argument('--notch', type=float, default=None, metavar='HZ',
+                        help='Notch mains at HZ (50 or 60) and harmonics, '
+                             'including where they alias to')
     args = parser.parse_args()
 
-    buffer = DataBuffer(BUFFER_SIZE)
+    if (args.spectrum != 'fft' or args.notch) and WelchAccumulator is None:
+        print("Error: --spectrum mean/ema and --notch need the analysis package "
+              "(run from software/python)")
+        sys.exit(1)
+
+    notch = None
+    if args.notch:
+        notch = NotchFilter(SAMPLE_RATE, mains_freq=args.notch)
+        print(f"Notching {', '.join(f'{f:g}' for f in notch.frequencies)} Hz")
+
+    buffer = DataBuffer(BUFFER_SIZE, notch)
     stop_event = Event()
 
     if args.demo:
@@ -328,7 +391,7 @@ def main():
     time.sleep(0.5)
 
     # Run plot
-    create_realtime_plot(buffer, stop_event)
+    create_realtime_plot(buffer, stop_event, args.spectrum)
 
     print("\nExiting...")
     stop_event.set()
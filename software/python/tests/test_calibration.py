@@ -0,0 +1,85 @@
+"""Ellipsoid fit of synthetic tumbles with known hard and soft iron."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.calibration import EllipsoidFitter, fit_ellipsoid
+
+COLUMNS = ['x', 'y', 'z']
+OFFSET = np.array([120.0, -80.0, 45.0])
+RADIUS = 500.0
+# Soft iron: maps the unit sphere onto the measured ellipsoid
+SOFT = np.array([[1.10, 0.05, -0.03],
+                 [0.05, 0.90, 0.04],
+                 [-0.03, 0.04, 1.02]])
+
+
+def _expected_shape():
+    inv = np.linalg.inv(RADIUS * SOFT)
+    return inv.T @ inv
+
+
+@pytest.fixture(scope='module')
+def tumble():
+    rng = np.random.default_rng(1)
+    n = 20000
+    u = rng.normal(size=(n, 3))
+    u /= np.linalg.norm(u, axis=1)[:, None]
+    xyz = RADIUS * u @ SOFT.T + OFFSET + rng.normal(scale=2.0, size=(n, 3))
+    return pd.DataFrame(xyz, columns=COLUMNS)
+
+
+@pytest.fixture(scope='module')
+def spiky(tumble):
+    rng = np.random.default_rng(2)
+    xyz = tumble.to_numpy().copy()
+    hit = rng.choice(len(xyz), len(xyz) // 100, replace=False)
+    xyz[hit] += rng.uniform(200, 2000, size=(len(hit), 1)) * np.array([1.0, 0.5, -0.3])
+    return pd.DataFrame(xyz, columns=COLUMNS)
+
+
+def test_fit_recovers_offset_and_soft_iron(tumble):
+    centre, m = fit_ellipsoid(tumble, COLUMNS)
+    np.testing.assert_allclose(centre, OFFSET, atol=0.2)
+    np.testing.assert_allclose(m, _expected_shape(), rtol=3e-3)
+
+
+def test_chunked_fit_matches_whole(tumble):
+    chunks = [tumble.iloc[i:i + 3000] for i in range(0, len(tumble), 3000)]
+    centre, m = fit_ellipsoid(tumble, COLUMNS)
+    # The points are normalized by the first chunk, and the algebraic
+    # fit is not quite invariant to that, so agreement is not exact
+    centre_s, m_s = fit_ellipsoid(iter(chunks), COLUMNS)
+    np.testing.assert_allclose(centre_s, centre, atol=0.01)
+    np.testing.assert_allclose(m_s, m, rtol=1e-4)
+
+
+def test_sphere_fit():
+    rng = np.random.default_rng(4)
+    u = rng.normal(size=(5000, 3))
+    u /= np.linalg.norm(u, axis=1)[:, None]
+    fitter = EllipsoidFitter(sphere=True)
+    fitter.update(RADIUS * u + OFFSET)
+    centre, m = fitter.solve()
+    np.testing.assert_allclose(centre, OFFSET, atol=1e-6)
+    np.testing.assert_allclose(m, np.eye(3) / RADIUS ** 2, rtol=1e-9)
+
+
+def test_tukey_rejects_spikes(spiky):
+    centre, m = fit_ellipsoid(spiky, COLUMNS, robust='tukey')
+    np.testing.assert_allclose(centre, OFFSET, atol=0.3)
+    np.testing.assert_allclose(m, _expected_shape(), rtol=1e-2)
+
+    # Plain least squares is dragged far off; Huber only bounds the pull
+    plain, _ = fit_ellipsoid(spiky, COLUMNS)
+    huber, _ = fit_ellipsoid(spiky, COLUMNS, robust='huber')
+    assert np.abs(plain - OFFSET).max() > 50
+    assert np.abs(huber - OFFSET).max() > 5
+
+
+def test_robust_needs_rereadable_data(tumble):
+    with pytest.raises(ValueError):
+        fit_ellipsoid(iter([tumble]), COLUMNS, robust='tukey')
+    with pytest.raises(ValueError):
+        fit_ellipsoid(tumble, COLUMNS, robust='cauchy')
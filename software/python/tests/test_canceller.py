@@ -0,0 +1,78 @@
+"""Reference noise canceller chunk invariance and edge cases."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import signal
+
+from analysis.signal_processing import AdaptiveCanceller, cancel_reference_noise
+
+FS = 100.0
+TARGETS = ['m1x_uT', 'm2x_uT']
+REFERENCES = ['m3x_uT', 'm3y_uT']
+
+
+@pytest.fixture
+def run():
+    rng = np.random.default_rng(2)
+    n = 8000
+    t = np.arange(n) / FS
+    ref = rng.normal(size=(n, 2))
+    # Targets see the references through short FIR paths, plus own noise
+    m1 = signal.lfilter([0.8, 0.3, -0.1], 1, ref[:, 0]) + 0.5 * ref[:, 1]
+    m2 = signal.lfilter([0.0, 0.6], 1, ref[:, 1])
+    own = 0.1 * rng.normal(size=(n, 2))
+    return pd.DataFrame({
+        'time_s': t,
+        'm1x_uT': 20 + m1 + own[:, 0],
+        'm2x_uT': -5 + m2 + own[:, 1],
+        'm3x_uT': 3 + ref[:, 0],
+        'm3y_uT': ref[:, 1],
+    })
+
+
+def _stream(df, sizes):
+    canceller = AdaptiveCanceller(FS, TARGETS, REFERENCES, taps=16)
+    bounds = np.cumsum([0] + sizes)
+    bounds = np.append(bounds[bounds < len(df)], len(df))
+    out = [canceller.update(df.iloc[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+    out.append(canceller.flush())
+    return np.concatenate(out), canceller
+
+
+@pytest.mark.parametrize('sizes', [[1, 15, 16, 17, 1000], [333] * 30, [7999]])
+def test_chunk_invariance(run, sizes):
+    whole, ref = _stream(run, [len(run)])
+    chunked, canceller = _stream(run, sizes)
+    assert chunked.shape == (len(run), len(TARGETS))
+    np.testing.assert_allclose(chunked, whole, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(canceller.weights, ref.weights, rtol=0, atol=1e-12)
+
+
+def test_cancels_reference_and_keeps_offset(run):
+    result, coef = cancel_reference_noise(run, TARGETS, REFERENCES, fs=FS, taps=16)
+    late = slice(len(run) // 2, None)
+    for col in TARGETS:
+        cleaned = result[f'{col}_anc'].to_numpy()[late]
+        assert np.std(cleaned) < 0.25 * np.std(run[col].to_numpy()[late])
+        # The kept offset is estimated from the first block only
+        assert np.mean(cleaned) == pytest.approx(run[col].mean(), abs=0.5)
+    assert coef['impulse_response'].shape == (2, 2, 16)
+    np.testing.assert_allclose(coef['impulse_response'][0, 0, :3], [0.8, 0.3, -0.1], atol=0.05)
+
+
+@pytest.mark.parametrize('train_until', [-1.0, 0.0, 30.0, 1e9])
+def test_train_until_edges(run, train_until):
+    result, _ = cancel_reference_noise(run, TARGETS, REFERENCES, fs=FS,
+                                       train_until=train_until, taps=16)
+    assert result[[f'{col}_anc' for col in TARGETS]].notna().all().all()
+    if train_until <= run['time_s'].iloc[0]:
+        # Nothing to train on: the filters stay at zero
+        np.testing.assert_allclose(result['m1x_uT_anc'], run['m1x_uT'])
+
+
+def test_no_duplicate_columns(run):
+    once, _ = cancel_reference_noise(run, TARGETS, REFERENCES, fs=FS, taps=16)
+    twice, _ = cancel_reference_noise(once, TARGETS, REFERENCES, fs=FS, taps=16)
+    assert twice.columns.is_unique
+    pd.testing.assert_frame_equal(twice, once)
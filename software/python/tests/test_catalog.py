@@ -0,0 +1,103 @@
+"""Incremental catalog updates and queries."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.catalog import ExperimentCatalog
+from analysis.data_loader import ACCEL_COLUMNS, MAG_COLUMNS
+
+
+def _write(path, n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    raw = pd.DataFrame({'timestamp_us': np.arange(n) * 10_000})
+    for col in MAG_COLUMNS + ACCEL_COLUMNS:
+        raw[col] = rng.integers(-2000, 2000, n)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    raw.to_csv(path, index=False)
+    return str(path.resolve())
+
+
+def _touch(path, seconds):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + int(seconds * 1e9)))
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'raw'
+    files = {
+        'cv100': _write(root / 'CV_001_20240115_1520_100Hz_20kV.csv'),
+        'cv200': _write(root / 'CV_002_20240115_1600_200Hz_20kV.csv', seed=1),
+        'sw': _write(root / 'day2' / 'SW_003_20240116_0900_50Hz_10kV.csv', n=800, seed=2),
+    }
+    return root, files
+
+
+def test_update_is_incremental(tree, tmp_path):
+    root, files = tree
+    with ExperimentCatalog(tmp_path / 'catalog.sqlite') as catalog:
+        first = catalog.update(root)
+        assert (first['added'], first['updated'], first['unchanged']) == (3, 0, 0)
+        assert first['errors'] == []
+        assert len(catalog) == 3
+
+        again = catalog.update(root)
+        assert (again['added'], again['updated'], again['unchanged']) == (0, 0, 3)
+
+        _write(root / 'CV_001_20240115_1520_100Hz_20kV.csv', n=700)
+        _touch(files['cv100'], 5)
+        os.remove(files['sw'])
+        changed = catalog.update(root)
+        assert (changed['updated'], changed['removed'], changed['unchanged']) == (1, 1, 1)
+        assert catalog.records(test_id='CV_001')[0]['sample_count'] == 700
+        assert len(catalog) == 2
+
+
+def test_failed_reindex_drops_stale_row(tree, tmp_path):
+    root, files = tree
+    with ExperimentCatalog(tmp_path / 'catalog.sqlite') as catalog:
+        catalog.update(root)
+        with open(files['cv200'], 'w') as f:
+            f.write('a,b\n1,2\n')
+        _touch(files['cv200'], 5)
+
+        result = catalog.update(root)
+        assert [f for f, _ in result['errors']] == [files['cv200']]
+        assert files['cv200'] not in catalog.query()
+        assert len(catalog) == 2
+
+        # Fixed files are picked up again
+        _write(root / 'CV_002_20240115_1600_200Hz_20kV.csv', seed=1)
+        assert catalog.update(root)['added'] == 1
+        assert files['cv200'] in catalog.query()
+
+
+def test_update_only_sees_its_root(tmp_path):
+    # _ is a LIKE wildcard, so raw_a must not match files under rawXa
+    a = _write(tmp_path / 'raw_a' / 'CV_001_20240115_1520.csv')
+    b = _write(tmp_path / 'rawXa' / 'CV_002_20240115_1520.csv')
+    with ExperimentCatalog(tmp_path / 'catalog.sqlite') as catalog:
+        catalog.update(tmp_path / 'rawXa')
+        result = catalog.update(tmp_path / 'raw_a')
+        assert (result['added'], result['removed']) == (1, 0)
+        assert catalog.query() == sorted([a, b])
+
+
+def test_query_filters(tree, tmp_path):
+    root, files = tree
+    with ExperimentCatalog(tmp_path / 'catalog.sqlite') as catalog:
+        catalog.update(root)
+        assert catalog.query(protocol='CV') == sorted([files['cv100'], files['cv200']])
+        assert catalog.query(frequency_hz=(100, None)) == sorted([files['cv100'], files['cv200']])
+        assert catalog.query(frequency_hz=(None, 100), voltage_kv=20) == [files['cv100']]
+        assert catalog.query(test_id=['CV_002', 'SW_003']) == sorted([files['cv200'], files['sw']])
+        assert catalog.query(amplitude_pct=None) == sorted(files.values())
+
+        record = catalog.records(protocol='SW')[0]
+        assert record['sample_count'] == 800
+        assert record['quality']['sample_count'] == 800
+        with pytest.raises(ValueError):
+            catalog.query(filepath='x')
@@ -0,0 +1,67 @@
+"""FFT and direct cross-correlation against np.correlate."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.signal_processing import (_correlation_method, correlation_matrix,
+                                        cross_correlation)
+
+
+@pytest.fixture(scope='module')
+def channels():
+    rng = np.random.default_rng(6)
+    n = 3000
+    base = rng.normal(size=n + 50)
+    # Channel 1 lags channel 0 by 7 samples, channel 2 is independent
+    return np.stack([base[50:] + 0.3 * rng.normal(size=n),
+                     base[43:-7] + 0.3 * rng.normal(size=n),
+                     rng.normal(size=n) + 5.0])
+
+
+def _baseline(x, max_lag):
+    """Normalised np.correlate of every pair."""
+    x = x - x.mean(axis=1, keepdims=True)
+    n = x.shape[1]
+    std = x.std(axis=1)
+    mid = n - 1
+    return np.array([[np.correlate(a, b, 'full')[mid - max_lag:mid + max_lag + 1]
+                      / (sa * sb * n) for b, sb in zip(x, std)] for a, sa in zip(x, std)])
+
+
+@pytest.mark.parametrize('max_lag', [0, 1, 40, 2999])
+def test_methods_match_np_correlate(channels, max_lag):
+    expected = _baseline(channels, max_lag)
+    for method in ('direct', 'fft'):
+        lags, corr = cross_correlation(channels, max_lag, method)
+        np.testing.assert_array_equal(lags, np.arange(-max_lag, max_lag + 1))
+        np.testing.assert_allclose(corr, expected, atol=1e-12)
+
+
+def test_max_lag_clipped_to_record(channels):
+    lags, corr = cross_correlation(channels[:, :20], max_lag=100, method='fft')
+    assert lags[-1] == 19
+    np.testing.assert_allclose(corr, _baseline(channels[:, :20], 19), atol=1e-12)
+
+
+def test_auto_picks_by_cost():
+    assert _correlation_method(1000, 2, 2) == 'direct'
+    assert _correlation_method(100000, 1000, 12) == 'fft'
+    with pytest.raises(ValueError):
+        cross_correlation(np.zeros((2, 10)), 3, method='wavelet')
+
+
+def test_correlation_matrix_finds_lag(channels):
+    df = pd.DataFrame(channels.T, columns=['m1x_uT', 'm1y_uT', 'ax_ms2'])
+    direct = correlation_matrix(df, max_lag=40, method='direct')
+    fft = correlation_matrix(df, max_lag=40, method='fft')
+    assert direct['columns'] == ['m1x_uT', 'm1y_uT', 'ax_ms2']
+    np.testing.assert_allclose(fft['corr'], direct['corr'], atol=1e-12)
+    np.testing.assert_array_equal(fft['peak_lag'], direct['peak_lag'])
+
+    # corr[i, j] peaks where x_i[n + lag] lines up with x_j[n]
+    assert direct['peak_lag'][0, 1] == -7
+    assert direct['peak_lag'][1, 0] == 7
+    assert direct['peak_corr'][0, 1] == pytest.approx(1 / 1.09, abs=0.05)
+    assert abs(direct['peak_corr'][0, 2]) < 0.1
+    np.testing.assert_allclose(np.diagonal(direct['corr'][:, :, 40]), 1.0)
@@ -0,0 +1,135 @@
+"""Chunked streaming vs whole-file loading, and the HDF5 round trip."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.data_loader import (ACCEL_COLUMNS, BINARY_HEADER_DTYPE, BINARY_MAGIC,
+                                  BINARY_SAMPLE_DTYPE, MAG_COLUMNS, MICROS_WRAP,
+                                  iter_experiment, load_experiment, parse_metadata,
+                                  validate_data)
+
+
+def _raw(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    # 100 Hz with jitter, starting close enough to the 32-bit limit to wrap
+    ts = MICROS_WRAP - 2_000_000 + np.cumsum(rng.integers(9_900, 10_100, n))
+    raw = pd.DataFrame({'timestamp_us': ts % MICROS_WRAP})
+    for col in MAG_COLUMNS + ACCEL_COLUMNS:
+        raw[col] = rng.integers(-2000, 2000, n)
+    return raw
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / 'CV_001_20240115_1520.csv'
+    _raw().to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def bin_file(tmp_path):
+    raw = _raw()
+    header = np.zeros(1, dtype=BINARY_HEADER_DTYPE)
+    header['magic'] = BINARY_MAGIC
+    header['version'] = 1
+    header['record_size'] = BINARY_SAMPLE_DTYPE.itemsize
+    header['sample_rate_hz'] = 100
+    samples = np.zeros(len(raw), dtype=BINARY_SAMPLE_DTYPE)
+    for col in BINARY_SAMPLE_DTYPE.names:
+        samples[col] = raw[col]
+    path = tmp_path / 'CV_001_20240115_1520.bin'
+    with open(path, 'wb') as f:
+        f.write(header.tobytes())
+        f.write(samples.tobytes())
+        f.write(b'\x01\x02\x03')  # Partial record of a log cut off mid-write
+    return str(path)
+
+
+@pytest.mark.parametrize('use_cache', [False, True])
+@pytest.mark.parametrize('chunksize', [61, 997, 4096, 100000])
+def test_chunks_match_whole_csv(csv_file, chunksize, use_cache):
+    whole, _ = load_experiment(csv_file, use_cache=use_cache)
+    chunks = list(iter_experiment(csv_file, chunksize=chunksize, use_cache=use_cache))
+    assert all(len(c) <= chunksize for c in chunks)
+    streamed = pd.concat(chunks, ignore_index=True)
+    pd.testing.assert_frame_equal(streamed, whole.reset_index(drop=True), check_dtype=False)
+
+
+def test_timestamps_unwrapped(csv_file):
+    whole, _ = load_experiment(csv_file, use_cache=False)
+    assert np.all(np.diff(whole['timestamp_us'].to_numpy()) > 0)
+    assert whole['time_s'].iloc[0] == 0
+    assert whole['time_s'].iloc[-1] == pytest.approx(50, abs=1)
+
+
+@pytest.mark.parametrize('chunksize', [333, 4096])
+def test_chunks_match_whole_binary(bin_file, chunksize):
+    whole, _ = load_experiment(bin_file)
+    streamed = pd.concat(iter_experiment(bin_file, chunksize=chunksize), ignore_index=True)
+    assert len(whole) == 5000
+    pd.testing.assert_frame_equal(streamed, whole.reset_index(drop=True), check_dtype=False)
+
+
+def test_validate_data_chunked_matches_whole(csv_file):
+    whole, _ = load_experiment(csv_file, use_cache=False)
+    expected = validate_data(whole)
+    assert validate_data(iter_experiment(csv_file, chunksize=777, use_cache=False)) == expected
+
+
+@pytest.fixture
+def h5_file(csv_file, tmp_path):
+    pytest.importorskip('h5py')
+    from analysis.calibration import AccelerometerCalibration, MagnetometerCalibration
+    from analysis.data_loader import export_hdf5
+
+    path = tmp_path / 'CV_001_20240115_1520.h5'
+    metadata = parse_metadata(csv_file)
+    metadata.frequency_hz = 100.0
+    metadata.notes = 'round trip'
+    calibrations = {
+        'm1': MagnetometerCalibration(offset_x=12.5, scale_y=1.02, soft_iron=np.eye(3) * 0.98,
+                                      offset_std=0.3, scale_std=0.004),
+        'm2': MagnetometerCalibration(offset_z=-7.0, sensitivity=10850.0),
+    }
+    accel = AccelerometerCalibration(offset_y=4.0, sensitivity=3.91, offset_std=0.2)
+    export_hdf5(iter_experiment(csv_file, chunksize=777, use_cache=False), str(path),
+                metadata=metadata, calibrations=calibrations, accel_calibration=accel,
+                chunk_rows=256)
+    return str(path), metadata, calibrations, accel
+
+
+def test_hdf5_round_trip(csv_file, h5_file):
+    from analysis.data_loader import load_hdf5
+
+    path, metadata, _, _ = h5_file
+    whole, _ = load_experiment(csv_file, use_cache=False)
+    loaded, loaded_meta = load_hdf5(path)
+    pd.testing.assert_frame_equal(loaded, whole, check_dtype=False)
+    assert loaded_meta.frequency_hz == metadata.frequency_hz
+    assert loaded_meta.notes == metadata.notes
+    assert loaded_meta.test_id == metadata.test_id
+
+
+@pytest.mark.parametrize('t_range', [(0.0, 1.0), (7.3, 19.01), (12.0, 12.0), (45.0, 1e9)])
+def test_hdf5_t_range(csv_file, h5_file, t_range):
+    path = h5_file[0]
+    expected, _ = load_experiment(csv_file, use_cache=False, t_range=t_range)
+    loaded, _ = load_experiment(path, t_range=t_range)
+    pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+
+
+def test_hdf5_calibration_round_trip(h5_file):
+    from analysis.data_loader import read_hdf5_calibration
+
+    path, _, calibrations, accel = h5_file
+    mag, loaded_accel = read_hdf5_calibration(path)
+    assert sorted(mag) == sorted(calibrations)
+    for sensor, cal in calibrations.items():
+        np.testing.assert_allclose(mag[sensor].offset, cal.offset)
+        np.testing.assert_allclose(mag[sensor].matrix, cal.matrix)
+        assert mag[sensor].sensitivity == cal.sensitivity
+        assert mag[sensor].offset_std == cal.offset_std
+        assert mag[sensor].scale_std == cal.scale_std
+    assert mag['m2'].soft_iron is None
+    assert loaded_accel == accel
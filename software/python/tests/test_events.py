@@ -0,0 +1,96 @@
+"""Jerk-triggered onsets, epochs and event averages on synthetic transients."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.events import (average_epochs, compute_jerk, detect_onsets, epoch_windows,
+                             event_average, extract_epochs)
+
+FS = 100.0
+ONSETS = np.arange(300, 19000, 450) + np.arange(42) % 7
+PRE, POST = 50, 200
+
+
+def _response(n):
+    # Decaying 3 Hz ring after the onset
+    t = np.arange(n) / FS
+    return 2.0 * np.exp(-t / 0.5) * np.sin(2 * np.pi * 3 * t)
+
+
+@pytest.fixture(scope='module')
+def record():
+    rng = np.random.default_rng(8)
+    n = 20000
+    df = pd.DataFrame({'time_s': np.arange(n) / FS})
+    for col in ['ax', 'ay', 'az']:
+        df[col] = rng.normal(scale=0.01, size=n)
+    mag = rng.normal(scale=0.5, size=(n, 2)) + [3.0, -1.0]
+    for onset in ONSETS:
+        df.loc[onset:, 'az'] += 1.0  # Step in acceleration: a jerk spike
+        mag[onset:onset + POST, 0] += _response(POST)
+    df['m1x'], df['m1y'] = mag.T
+    return df
+
+
+def test_detect_onsets_finds_steps(record):
+    jerk = compute_jerk(record, FS)
+    assert list(jerk.columns) == ['jx', 'jy', 'jz', 'jerk_mag']
+    onsets = detect_onsets(jerk['jerk_mag'].to_numpy(), FS, threshold=10, refractory_s=2.0)
+    # The Savitzky-Golay derivative spreads each step over a few samples
+    assert len(onsets) == len(ONSETS)
+    assert np.all(np.abs(onsets - ONSETS) <= 2)
+
+
+def test_refractory_suppresses_ringing():
+    x = np.zeros(2000)
+    x[[100, 110, 120, 1000]] = 10.0
+    np.testing.assert_array_equal(detect_onsets(x, FS, refractory_s=0.5), [100, 1000])
+    np.testing.assert_array_equal(detect_onsets(x, FS, refractory_s=0.05), [100, 110, 120, 1000])
+
+
+def test_epoch_windows_is_a_view():
+    values = np.arange(60.0).reshape(30, 2)
+    windows = epoch_windows(values, 3, 4)
+    assert np.shares_memory(windows, values)
+    assert windows.shape == (24, 2, 7)
+    np.testing.assert_array_equal(windows[10 - 3], values[7:14].T)
+
+
+def test_extract_epochs_copies_and_drops_edges():
+    values = np.random.default_rng(0).normal(size=(1000, 3))
+    onsets = np.array([10, 100, 500, 990])
+    epochs, used = extract_epochs(values, onsets, 20, 30)
+    np.testing.assert_array_equal(used, [100, 500])
+    assert not np.shares_memory(epochs, values)
+    for epoch, onset in zip(epochs, used):
+        raw = values[onset - 20:onset + 30].T
+        np.testing.assert_allclose(epoch, raw - raw[:, :20].mean(axis=1, keepdims=True))
+
+    raw_epochs, _ = extract_epochs(values, onsets, 20, 30, baseline=False)
+    np.testing.assert_array_equal(raw_epochs[1], values[480:530].T)
+
+
+def test_average_epochs_matches_extracted(record):
+    values = record[['m1x', 'm1y']].to_numpy()
+    result = average_epochs(values, ONSETS, PRE, POST)
+    epochs, used = extract_epochs(values, ONSETS, PRE, POST)
+    assert result['n_events'] == len(used) == len(ONSETS)
+    np.testing.assert_allclose(result['mean'], epochs.mean(axis=0), atol=1e-12)
+    np.testing.assert_allclose(result['std'], epochs.std(axis=0, ddof=1), atol=1e-12)
+
+
+def test_event_average_recovers_response(record):
+    result = event_average(record, pre_s=PRE / FS, post_s=POST / FS,
+                           columns=['m1x', 'm1y'], threshold=10, refractory_s=2.0)
+    assert result['n_events'] == len(ONSETS)
+    assert result['time_s'][0] == pytest.approx(-PRE / FS)
+    assert len(result['time_s']) == PRE + POST
+
+    # Detection fires a sample or two before each step
+    lead = int(np.median(ONSETS - result['onsets']))
+    expected = _response(POST - lead)
+    np.testing.assert_allclose(result['mean'][0, PRE + lead:], expected, atol=0.3)
+    np.testing.assert_allclose(result['mean'][0, :PRE + lead], 0, atol=0.3)
+    inside = (result['ci_low'][1] <= 0) & (0 <= result['ci_high'][1])
+    assert inside.mean() > 0.85
@@ -0,0 +1,40 @@
+"""Chunked vs whole-record bandpass filter bank."""
+
+import numpy as np
+import pytest
+from scipy import signal
+
+from analysis.signal_processing import bandpass_sos, filter_bank
+
+FS = 100.0
+
+
+@pytest.fixture(scope='module')
+def record():
+    rng = np.random.default_rng(11)
+    n = 30000
+    t = np.arange(n) / FS
+    tone = np.sin(2 * np.pi * 7 * t) * (1 + 0.5 * np.sin(2 * np.pi * 0.05 * t))
+    return np.stack([tone + rng.normal(size=n), rng.normal(size=n)])
+
+
+def test_whole_record_is_sosfiltfilt(record):
+    filtered, envelope = filter_bank(record, [7, 14], FS)
+    for i, freq in enumerate([7, 14]):
+        expected = signal.sosfiltfilt(bandpass_sos(freq, 5, FS), record, axis=-1)
+        np.testing.assert_allclose(filtered[i], expected)
+    assert np.all(envelope >= np.abs(filtered) - 1e-12)
+
+
+@pytest.mark.parametrize('chunk_size', [1000, 4096, 20000])
+def test_chunked_matches_whole(record, chunk_size):
+    filtered, envelope = filter_bank(record, [7, 14], FS)
+    chunk_filtered, chunk_envelope = filter_bank(record, [7, 14], FS, chunk_size=chunk_size)
+
+    peak = envelope.max(axis=-1, keepdims=True)
+    np.testing.assert_allclose(chunk_filtered, filtered, rtol=0, atol=1e-4 * peak.max())
+    error = np.abs(chunk_envelope - envelope) / peak
+    assert error.max() < 5e-3
+    assert np.median(error) < 2e-4
+    # Record ends included
+    assert error[..., :100].max() < 5e-3 and error[..., -100:].max() < 5e-3
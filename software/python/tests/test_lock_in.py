@@ -0,0 +1,61 @@
+"""Lock-in demodulation of synthetic harmonics with known amplitude and phase."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.signal_processing import lock_in
+
+FS = 100.0
+DRIVE = 7.3
+# (harmonic, amplitude, phase) of each channel
+COMPONENTS = [(1, 2.0, 0.7), (2, 0.5, -2.1), (3, 1.3, 2.9)]
+
+
+def _record(noise=0.0, seed=3, n=60000):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / FS
+    # Slow wander of the drive phase, which the reference has to follow
+    phase = 2 * np.pi * DRIVE * t + 0.3 * np.sin(2 * np.pi * 0.05 * t)
+    axis = np.array([0.3, -0.2, 0.93])
+    axis /= np.linalg.norm(axis)
+    df = pd.DataFrame({'time_s': t})
+    for col, a in zip(['ax', 'ay', 'az'], axis):
+        df[col] = 50 * a * np.cos(phase) + rng.normal(size=n)
+    for i, (h, amp, theta) in enumerate(COMPONENTS):
+        df[f'c{i}'] = amp * np.cos(h * phase + theta) + 10.0 + noise * rng.normal(size=n)
+    return df, axis
+
+
+def test_lock_in_recovers_amplitude_and_phase():
+    df, axis = _record()
+    columns = [f'c{i}' for i in range(len(COMPONENTS))]
+    out = lock_in(df, harmonics=(1, 2, 3), columns=columns)
+
+    assert out['frequency_hz'] == pytest.approx(DRIVE, abs=0.1)
+    np.testing.assert_allclose(out['reference_axis'], axis, atol=1e-3)
+    for i, (h, amp, theta) in enumerate(COMPONENTS):
+        k = out['harmonics'].index(h)
+        assert out['amplitude'][k, i] == pytest.approx(amp, rel=2e-3)
+        assert np.angle(np.exp(1j * (out['phase'][k, i] - theta))) == pytest.approx(0, abs=5e-3)
+        # I + iQ = A exp(i theta) point by point, not just on average
+        z = out['I'][k, i] + 1j * out['Q'][k, i]
+        np.testing.assert_allclose(z[1:-1], amp * np.exp(1j * theta), atol=0.05 * amp)
+        # Other harmonics of the same channel stay near zero
+        for other in range(len(COMPONENTS)):
+            if other != k:
+                assert out['amplitude'][other, i] < 0.01 * amp
+
+
+def test_lock_in_errors_match_scatter():
+    amplitudes, phases, amp_errs = [], [], []
+    for seed in range(20):
+        df, _ = _record(noise=3.0, seed=seed, n=20000)
+        out = lock_in(df, harmonics=(1,), drive_freq=DRIVE, columns=['c0'])
+        amplitudes.append(out['amplitude'][0, 0])
+        phases.append(out['phase'][0, 0])
+        amp_errs.append(out['amplitude_err'][0, 0])
+    _, amp, theta = COMPONENTS[0]
+    assert np.mean(amplitudes) == pytest.approx(amp, abs=3 * np.mean(amp_errs) / np.sqrt(20))
+    assert np.std(amplitudes, ddof=1) == pytest.approx(np.mean(amp_errs), rel=0.5)
+    assert np.mean(phases) == pytest.approx(theta, abs=0.02)
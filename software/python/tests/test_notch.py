@@ -0,0 +1,66 @@
+"""NotchFilter streaming and offline paths."""
+
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+from analysis.signal_processing import NotchFilter, remove_mains_noise
+
+FS = 100.0
+
+
+def _record(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / FS
+    clean = np.sin(2 * np.pi * 3 * t)
+    # 60 Hz mains and its harmonics alias to 20 and 40 Hz at 100 Hz
+    hum = 0.5 * np.sin(2 * np.pi * 20 * t) + 0.3 * np.sin(2 * np.pi * 40 * t + 1)
+    return t, clean, (clean + hum)[:, None] * [1, 2] + 0.01 * rng.normal(size=(n, 2))
+
+
+def test_chunked_matches_one_shot():
+    _, _, x = _record()
+    whole = NotchFilter(FS, mains_freq=60).filter(x)
+
+    notch = NotchFilter(FS, mains_freq=60)
+    bounds = [0, 1, 7, 500, 501, 1800, len(x)]
+    chunked = np.concatenate([notch.filter(x[a:b]) for a, b in zip(bounds[:-1], bounds[1:])])
+    np.testing.assert_allclose(chunked, whole, rtol=0, atol=1e-12)
+
+
+def test_streaming_is_causal_sosfilt():
+    _, _, x = _record()
+    notch = NotchFilter(FS, mains_freq=60)
+    y = notch.filter(x)
+    zi = signal.sosfilt_zi(notch.sos)[..., None] * x[0]
+    expected, _ = signal.sosfilt(notch.sos, x, axis=0, zi=zi)
+    np.testing.assert_allclose(y, expected)
+    # Causal: a change late in the record does not affect earlier output
+    x2 = x.copy()
+    x2[2000:] += 1.0
+    np.testing.assert_array_equal(NotchFilter(FS, mains_freq=60).filter(x2)[:2000], y[:2000])
+
+
+def test_dataframe_chunks_and_reset():
+    _, _, x = _record()
+    df = pd.DataFrame(x, columns=['a', 'b'])
+    notch = NotchFilter(FS, mains_freq=60, columns=['a', 'b'])
+    first = notch.filter(df)
+    notch.reset()
+    np.testing.assert_array_equal(notch.filter(df), first)
+
+
+def test_streaming_removes_hum_after_settling():
+    _, clean, x = _record(n=6000)
+    y = NotchFilter(FS, mains_freq=60).filter(x[:, 0])
+    assert np.std(y[3000:] - clean[3000:]) < 0.1 * np.std(x[3000:, 0] - clean[3000:])
+
+
+def test_remove_mains_noise_zero_phase_and_no_duplicates():
+    t, clean, x = _record()
+    df = pd.DataFrame({'time_s': t, 'a': x[:, 0]})
+    out = remove_mains_noise(df, 'a', mains_freq=60)
+    expected = NotchFilter(FS, 60).filtfilt(x[:, 0])
+    np.testing.assert_allclose(out['a_notch'].to_numpy(), expected)
+    again = remove_mains_noise(out, 'a', mains_freq=60)
+    assert list(again.columns) == ['time_s', 'a', 'a_notch']
@@ -0,0 +1,68 @@
+"""Streaming Welch accumulation vs the batch PSD."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.signal_processing import WelchAccumulator, clear_spectra_cache, compute_spectra
+
+FS = 100.0
+
+
+@pytest.fixture
+def run():
+    rng = np.random.default_rng(1)
+    n = 20011
+    t = np.arange(n) / FS
+    return pd.DataFrame({
+        'time_s': t,
+        'm1x_uT': rng.normal(size=n) + np.sin(2 * np.pi * 7 * t),
+        'm2x_uT': rng.normal(size=n).cumsum() * 0.01,
+        'm3x_uT': 5 + rng.normal(size=n),
+    })
+
+
+def _chunks(df, sizes):
+    i = 0
+    for size in sizes:
+        yield df.iloc[i:i + size]
+        i += size
+    if i < len(df):
+        yield df.iloc[i:]
+
+
+@pytest.mark.parametrize('nperseg,noverlap', [(256, None), (512, 100), (1000, 0)])
+@pytest.mark.parametrize('sizes', [[len], [1, 255, 256, 3000, 17], [4096] * 5])
+def test_accumulator_matches_compute_spectra(run, nperseg, noverlap, sizes):
+    columns = ['m1x_uT', 'm2x_uT', 'm3x_uT']
+    f, expected = compute_spectra(run, columns, fs=FS, nperseg=nperseg, noverlap=noverlap)
+
+    acc = WelchAccumulator(FS, nperseg, noverlap, columns=columns)
+    sizes = [len(run)] if sizes == [len] else sizes
+    for chunk in _chunks(run, sizes):
+        acc.update(chunk)
+    freqs, psd = acc.psd()
+    np.testing.assert_allclose(freqs, f)
+    np.testing.assert_allclose(psd, expected, rtol=1e-10, atol=1e-14)
+
+
+def test_array_chunks_and_ema(run):
+    x = run[['m1x_uT', 'm3x_uT']].to_numpy()
+    whole = WelchAccumulator(FS, 256, alpha=0.2)
+    whole.update(x)
+    acc = WelchAccumulator(FS, 256, alpha=0.2)
+    for i in range(0, len(x), 333):
+        acc.update(x[i:i + 333])
+    assert acc.count == whole.count
+    np.testing.assert_allclose(acc.psd()[1], whole.psd()[1])
+    np.testing.assert_allclose(acc.ema()[1], whole.ema()[1])
+
+
+def test_cached_results_are_private_copies(run):
+    clear_spectra_cache()
+    f, psd = compute_spectra(run, cache_key='run')
+    psd[:] = 0
+    f2, psd2 = compute_spectra(run, cache_key='run')
+    assert psd2.flags.writeable and psd2.sum() > 0
+    np.testing.assert_allclose(psd2, compute_spectra(run)[1])
+    clear_spectra_cache()
@@ -0,0 +1,79 @@
+"""Spectrogram pyramid against scipy.signal.spectrogram."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import signal
+
+from analysis.spectrogram import SpectrogramPyramid, build_spectrogram_pyramid
+
+FS = 100.0
+N = 20000 + 77  # Not a whole number of frames at any level
+COLUMNS = ['x', 'y']
+
+
+@pytest.fixture(scope='module')
+def record():
+    rng = np.random.default_rng(5)
+    t = np.arange(N) / FS
+    return pd.DataFrame({
+        'time_s': t + 12.5,
+        'x': np.sin(2 * np.pi * 7 * t) + rng.normal(size=N),
+        'y': rng.normal(size=N),
+    })
+
+
+@pytest.fixture(scope='module')
+def store(record, tmp_path_factory):
+    path = tmp_path_factory.mktemp('spec') / 'run.spec'
+    chunks = (record.iloc[i:i + 1234] for i in range(0, N, 1234))
+    build_spectrogram_pyramid(chunks, path, columns=COLUMNS, fs=FS, tile_frames=50)
+    return SpectrogramPyramid(path)
+
+
+@pytest.fixture(scope='module')
+def reference(record):
+    x = record[COLUMNS].to_numpy().T
+    return signal.spectrogram(x, fs=FS, nperseg=256, noverlap=128)
+
+
+def test_level0_matches_scipy(store, reference):
+    f_ref, t_ref, s_ref = reference
+    freqs, times, sxx = store.read(level=0)
+    np.testing.assert_allclose(freqs, f_ref)
+    np.testing.assert_allclose(times, t_ref + 12.5)
+    np.testing.assert_allclose(sxx, s_ref, rtol=3e-6, atol=3e-8)
+
+
+def test_coarser_levels_average_segments(store, reference):
+    _, t_ref, s_ref = reference
+    n_avg = store.levels[1]['n_avg']
+    freqs, times, sxx = store.read(level=1)
+    n_full = len(t_ref) // n_avg
+    assert len(times) == -(-len(t_ref) // n_avg)
+
+    full = s_ref[..., :n_full * n_avg].reshape(*s_ref.shape[:2], n_full, n_avg)
+    np.testing.assert_allclose(sxx[..., :n_full], full.mean(axis=-1), rtol=1e-5, atol=1e-8)
+    np.testing.assert_allclose(times[:n_full],
+                               t_ref[:n_full * n_avg].reshape(n_full, n_avg).mean(axis=1) + 12.5)
+
+    # The last frame averages the leftover segments and is centred on them
+    tail = s_ref[..., n_full * n_avg:]
+    np.testing.assert_allclose(sxx[..., -1], tail.mean(axis=-1), rtol=1e-5, atol=1e-8)
+    assert times[-1] == pytest.approx(t_ref[n_full * n_avg:].mean() + 12.5)
+
+
+def test_t_range_reads_across_tiles(store):
+    _, times, whole = store.read(level=0)
+    t_range = (times[37], times[140])
+    _, t_part, part = store.read(level=0, t_range=t_range, columns=['y'])
+    np.testing.assert_array_equal(t_part, times[37:140])
+    np.testing.assert_array_equal(part, whole[1:, :, 37:140])
+
+
+def test_choose_level_respects_frame_budget(store):
+    n0 = store.levels[0]['n_frames']
+    assert store.choose_level(max_frames=n0) == 0
+    assert store.choose_level(max_frames=n0 - 1) == 1
+    _, times, _ = store.read(max_frames=20)
+    assert len(times) <= 20
@@ -0,0 +1,110 @@
+"""Significance tests, multiple comparison correction and excess power."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import signal, stats
+
+from analysis.spectral_stats import excess_power_test
+from analysis.statistics import (block_bootstrap_test, default_block_length,
+                                 detection_statistics, multiple_comparison_correction)
+
+
+def _ar1(rng, n, phi):
+    """Stationary AR(1) series with unit innovations."""
+    zi = [rng.normal() / np.sqrt(1 - phi ** 2)]
+    return signal.lfilter([1], [1, -phi], rng.normal(size=n), zi=zi)[0]
+
+
+def test_block_length_grows_with_correlation():
+    rng = np.random.default_rng(5)
+    lengths = [np.median([default_block_length(_ar1(rng, 1000, phi)) for _ in range(9)])
+               for phi in (0.0, 0.5, 0.9)]
+    assert lengths[0] == 10  # N^(1/3) floor for white noise
+    assert lengths[0] <= lengths[1] < lengths[2]
+    assert 30 <= lengths[2] <= 95
+
+
+def _false_positive_rate(block_length, trials=200):
+    rng = np.random.default_rng(6)
+    hits = 0
+    for i in range(trials):
+        result = block_bootstrap_test(_ar1(rng, 1000, 0.9), _ar1(rng, 1000, 0.9),
+                                      n_resamples=1000, block_length=block_length, seed=i)
+        hits += result['p_value'][0] < 0.05
+    return hits / trials
+
+
+def test_bootstrap_false_positive_rate_on_ar1_null():
+    # A 10-sample block, what the 1/e rule picked, rejects about a
+    # quarter of null runs; the default must stay close to nominal
+    assert _false_positive_rate(10) > 0.18
+    assert _false_positive_rate(None) < 0.14
+
+
+def test_detection_statistics_bootstrap():
+    rng = np.random.default_rng(7)
+    sig, base = _ar1(rng, 500, 0.5) + 0.5, _ar1(rng, 500, 0.5)
+    ttest = detection_statistics(sig, base)
+    boot = detection_statistics(sig, base, method='block_bootstrap', n_resamples=2000, seed=1)
+    assert ttest['t_stat'] == pytest.approx(stats.ttest_ind(sig, base).statistic)
+    assert np.isnan(boot['t_stat'])
+    assert boot['mean_diff'] == ttest['mean_diff']
+    assert boot['p_value'] > ttest['p_value']
+    with pytest.raises(ValueError):
+        detection_statistics(sig, base, method='wilcoxon')
+
+
+@pytest.mark.parametrize('method,scipy_method', [('fdr', 'bh'), ('fdr_by', 'by')])
+@pytest.mark.parametrize('shape', [(1,), (57,), (6, 129)])
+def test_fdr_matches_scipy(method, scipy_method, shape):
+    rng = np.random.default_rng(3)
+    p = rng.uniform(size=shape) ** 3
+    p.flat[::7] = p.flat[0]  # Ties
+    expected = stats.false_discovery_control(p.ravel(), method=scipy_method).reshape(shape)
+    np.testing.assert_allclose(multiple_comparison_correction(p, method), expected, rtol=1e-12)
+
+
+def test_nan_passes_through():
+    p = np.array([0.001, 0.02, np.nan, 0.5])
+    q = multiple_comparison_correction(p, 'fdr')
+    assert np.isnan(q[2])
+    finite = [0, 1, 3]
+    np.testing.assert_allclose(q[finite], stats.false_discovery_control(p[finite]))
+    np.testing.assert_allclose(multiple_comparison_correction(p, 'bonferroni')[finite],
+                               [0.003, 0.06, 1.0])
+    assert np.isnan(multiple_comparison_correction(np.full(3, np.nan), 'fdr')).all()
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        multiple_comparison_correction([0.1], 'holm')
+
+
+def _run(seed=4):
+    fs = 100.0
+    rng = np.random.default_rng(seed)
+    n = 60000
+    t = np.arange(n) / fs
+    on = (t >= 200) & (t < 400)
+    return pd.DataFrame({
+        'time_s': t,
+        'm1x': rng.normal(size=n) + on * 0.5 * np.sin(2 * np.pi * 7 * t),
+        'm1y': rng.normal(size=n),
+        'm1z': np.full(n, 3.0),  # Dead channel: 0/0 power ratio
+    }), on, ~on
+
+
+def test_flat_channel_does_not_hide_detections():
+    df, signal_mask, baseline_mask = _run()
+    result = excess_power_test(df, signal_mask, baseline_mask, ['m1x', 'm1y', 'm1z'], fs=100)
+    assert np.isnan(result['q_value'][2]).all()
+    best = result['detections'][0]
+    assert best['column'] == 'm1x'
+    assert best['frequency_hz'] == pytest.approx(7, abs=0.5)
+
+
+def test_empty_columns_rejected():
+    df, signal_mask, baseline_mask = _run()
+    with pytest.raises(ValueError):
+        excess_power_test(df, signal_mask, baseline_mask, columns=[], fs=100)
@@ -0,0 +1,78 @@
+"""Calibration uncertainties and their Monte Carlo propagation."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.calibration import (MagnetometerCalibration, calibrate_accel_from_tumble,
+                                  calibrate_array, calibrate_from_tumble)
+from analysis.uncertainty import _window_moments, propagate_detection, sample_mag_calibrations
+
+OFFSET = np.array([120.0, -80.0, 30.0])
+
+
+def _tumble(n=5000, noise=3.0, seed=0, columns=('m1x', 'm1y', 'm1z')):
+    rng = np.random.default_rng(seed)
+    u = rng.normal(size=(n, 3))
+    u /= np.linalg.norm(u, axis=1)[:, None]
+    xyz = 500 * u * [1.1, 0.9, 1.0] + OFFSET + noise * rng.normal(size=(n, 3))
+    return pd.DataFrame(xyz, columns=list(columns))
+
+
+@pytest.mark.parametrize('method', ['ellipsoid', 'minmax'])
+def test_tumble_stds_match_spread_of_repeated_fits(method):
+    cals = [calibrate_from_tumble(_tumble(seed=s), 'm1', method=method) for s in range(20)]
+    offsets = np.array([c.offset for c in cals])
+    predicted = np.mean([c.offset_std for c in cals])
+    observed = np.sqrt(np.mean((offsets - OFFSET) ** 2))
+    assert predicted > 0
+    assert 0.5 < predicted / observed < 2
+    assert all(c.scale_std > 0 for c in cals)
+
+
+def test_accel_tumble_stds():
+    cal = calibrate_accel_from_tumble(_tumble(columns=('ax', 'ay', 'az')) / 2)
+    assert 0 < cal.offset_std < 1
+    assert 0 < cal.sensitivity_std < 0.01 * cal.sensitivity
+
+
+def test_window_moments_match_brute_force():
+    rng = np.random.default_rng(9)
+    raw = rng.normal(size=(500, 2, 3)) * 50 + [[100, -20, 400], [0, 30, -300]]
+    cals = {s: MagnetometerCalibration(offset_x=5, offset_y=-3, offset_z=8,
+                                       scale_x=1.05, scale_y=0.97, offset_std=4,
+                                       scale_std=0.02, sensitivity_std=200)
+            for s in ('m1', 'm2')}
+    offsets, matrices = sample_mag_calibrations(cals, ['m1', 'm2'], 7, rng)
+    mean, var = _window_moments(offsets, matrices, raw, block_elements=64)
+
+    for d in range(7):
+        cal, mag = calibrate_array(raw, offsets[d], matrices[d], dtype=np.float64)
+        values = np.concatenate([cal, mag[..., None]], axis=2)      # (N, S, 4)
+        np.testing.assert_allclose(mean[d], values.mean(axis=0), rtol=1e-12, atol=1e-12)
+        np.testing.assert_allclose(var[d], values.var(axis=0), rtol=1e-9, atol=1e-12)
+
+
+def _run(n=4000, seed=10):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n, 3)) * 20 + [200, -100, 300],
+                      columns=['m1x', 'm1y', 'm1z'])
+    mask = np.arange(n) >= n // 2
+    return df, mask, ~mask
+
+
+def test_default_calibrations_warn_and_have_no_spread():
+    df, signal_mask, baseline_mask = _run()
+    with pytest.warns(UserWarning, match='no uncertainties'):
+        result = propagate_detection(df, signal_mask, baseline_mask, n_draws=50, seed=0)
+    std = result['std_baseline']
+    assert np.all(std.std(axis=0) <= 1e-12 * std.mean(axis=0))
+
+
+def test_tumble_calibration_gives_spread():
+    df, signal_mask, baseline_mask = _run()
+    cals = {'m1': calibrate_from_tumble(_tumble(), 'm1', method='ellipsoid')}
+    result = propagate_detection(df, signal_mask, baseline_mask, calibrations=cals,
+                                 n_draws=200, seed=0)
+    spread = result['std_baseline'].std(axis=0) / result['std_baseline'].mean(axis=0)
+    assert np.all(spread > 1e-6)